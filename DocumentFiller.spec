@@ -20,6 +20,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=datas,
+    # Bundled but imported lazily by the app, so they cost nothing until first used
     hiddenimports=['pandas', 'docxtpl', 'pypdf', 'fdfgen', 'docx2pdf'],
     hookspath=[],
     hooksconfig={},
@@ -41,7 +42,7 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,  # UPX-packed DLLs are unpacked on every start, which slows cold starts
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -56,7 +57,7 @@ coll = COLLECT(
     a.zipfiles,
     a.datas,
     strip=False,
-    upx=True,
+    upx=False,
     upx_exclude=[],
     name='DocumentFiller',
 )
\ No newline at end of file
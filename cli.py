@@ -0,0 +1,150 @@
+"""Headless command line for the Document Filler Tool.
+
+Runs the same services as the GUI without Tk, e.g.:
+
+    python main.py generate --data inputs.xlsx --templates templates_dir --out out_dir --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import logging
+from services.excel_parser import read_excel_data, read_excel_records, get_sheet_names, EXCEL_READERS, DEFAULT_EXCEL_READER
+from services.merge_policy import MERGE_POLICIES
+from services.data_sources import DEFAULT_TABLE, is_excel_file, load_record, load_records as load_source_records
+from services.pdf_filler import PDF_ENGINES
+from services.generation import GenerationEngine, DEFAULT_WORKERS
+from services.pdftk_runner import get_pdftk_pool
+from services.docx_to_pdf import CONVERTER_BACKENDS
+from services.workbook_cache import clear_workbook_cache
+from utils.logging_setup import configure_logging, LOG_LEVELS
+
+# The interactive policy needs the GUI dialog
+CLI_MERGE_POLICIES = [policy for policy in MERGE_POLICIES if policy != "interactive"]
+
+def collect_templates(paths):
+    """Expand template files and folders into a sorted list of .docx and .pdf paths."""
+    templates = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                # Skip Office lock files such as "~$letter.docx"
+                if name.lower().endswith((".docx", ".pdf")) and not name.startswith("~$"):
+                    templates.append(os.path.join(path, name))
+        elif os.path.isfile(path):
+            templates.append(path)
+        else:
+            raise FileNotFoundError(f"Template path not found: {path}")
+    return templates
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="document_filler", description="Fill Word and PDF templates without the GUI.")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, help="Log file level (default: DOCUMENT_FILLER_LOG_LEVEL, then DEBUG)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Generate document packets")
+    generate.add_argument("--data", required=True, help="Input workbook (.xlsx, .xlsm), .csv, .json or SQLite database")
+    generate.add_argument("--client", help="Client_Number to generate from a CSV, JSON or SQLite source (default: every client)")
+    generate.add_argument("--table", default=DEFAULT_TABLE, help="SQLite table holding the clients")
+    generate.add_argument("--templates", required=True, nargs="+", help="Template files or folders of templates")
+    generate.add_argument("--out", required=True, help="Output folder")
+    generate.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Templates to generate at once")
+    generate.add_argument("--pdf-engine", choices=PDF_ENGINES, default=PDF_ENGINES[0], help="Backend used to fill PDF forms")
+    generate.add_argument("--converter", choices=CONVERTER_BACKENDS, default="auto",
+                          help="DOCX-to-PDF backend (auto: Word on Windows, LibreOffice on Linux)")
+    generate.add_argument("--no-originals", action="store_true",
+                          help="Skip the originals/ copies (Word documents and unflattened PDFs)")
+    generate.add_argument("--sheets", help="Comma-separated sheets to read (default: all sheets)")
+    generate.add_argument("--merge-policy", choices=CLI_MERGE_POLICIES, default="first-wins",
+                          help="How to resolve a key whose value differs between selected sheets")
+    generate.add_argument("--sheet-priority", help="Comma-separated sheets, most trusted first (for --merge-policy sheet-priority)")
+    generate.add_argument("--conflict-report", help="Write the conflicting keys and the chosen values to this JSON file")
+    generate.add_argument("--nrows", type=int, help="Rows to read from each sheet")
+    generate.add_argument("--excel-reader", choices=EXCEL_READERS, default=DEFAULT_EXCEL_READER,
+                          help="stream: read only the key and value columns row by row; pandas: parse whole sheets")
+    generate.add_argument("--batch", choices=("columns", "rows"),
+                          help="Read one client per column or per row of the first selected sheet")
+    generate.add_argument("--report", help="Write a JSON timing report to this file")
+    generate.add_argument("--no-cache", action="store_true", help="Re-read the workbook instead of using the local cache")
+
+    subparsers.add_parser("clear-cache", help="Delete the local cache of parsed workbooks")
+    return parser
+
+def load_records(args):
+    """Load the data records requested on the command line without any dialogs."""
+    if not is_excel_file(args.data):
+        if args.client:
+            return [load_record(args.data, args.client, args.table)]
+        return load_source_records(args.data, table=args.table)
+    sheets = [sheet.strip() for sheet in args.sheets.split(",")] if args.sheets else None
+    if args.batch:
+        return read_excel_records(args.data, layout=args.batch, sheet_name=sheets[0] if sheets else None, nrows=args.nrows)
+    if sheets is None:
+        sheets = get_sheet_names(args.data)
+    sheet_priority = [sheet.strip() for sheet in args.sheet_priority.split(",")] if args.sheet_priority else None
+    return [read_excel_data(args.data, args.nrows, sheet_names=sheets, merge_policy=args.merge_policy,
+                            sheet_priority=sheet_priority, conflict_report=args.conflict_report, use_cache=not args.no_cache,
+                            reader=args.excel_reader)]
+
+def run_generate(args):
+    start_time = time.time()
+    templates = collect_templates(args.templates)
+    if not templates:
+        print("No .docx or .pdf templates found", file=sys.stderr)
+        return 2
+
+    records = load_records(args)
+    load_time = time.time() - start_time
+    print(f"Loaded {len(records)} record(s) in {load_time:.2f}s; {len(templates)} template(s)")
+
+    def on_progress(done, total, result):
+        status = "OK  " if result.ok else "FAIL"
+        print(f"[{done}/{total}] {status} {os.path.basename(result.template_path)} ({result.elapsed:.2f}s)"
+              + ("" if result.ok else f": {result.error}"))
+
+    with GenerationEngine(workers=args.workers, conversion_backend=args.converter,
+                          keep_originals=not args.no_originals) as engine:
+        packets = engine.generate_batch(records, templates, args.out, pdf_engine=args.pdf_engine, progress_callback=on_progress)
+
+    results = [result for _, _, packet_results in packets for result in packet_results]
+    failed = [result for result in results if not result.ok]
+    total_time = time.time() - start_time
+    print(f"Generated {len(results) - len(failed)}/{len(results)} documents in {total_time:.2f}s")
+
+    if args.report:
+        report = {
+            "workers": args.workers,
+            "pdf_engine": args.pdf_engine,
+            "converter": args.converter,
+            "records": len(records),
+            "templates": len(templates),
+            "load_seconds": load_time,
+            "total_seconds": total_time,
+            "pdftk": get_pdftk_pool().stats(),
+            "results": [
+                {"template": result.template_path, "outputs": result.outputs, "error": result.error, "seconds": result.elapsed}
+                for result in results
+            ],
+        }
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if failed else 0
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level)
+    logging.debug(f"CLI invoked: {args}")
+    try:
+        if args.command == "generate":
+            return run_generate(args)
+        if args.command == "clear-cache":
+            print(f"Removed {clear_workbook_cache()} cached workbook(s)")
+    except Exception as e:
+        logging.error(f"CLI error: {str(e)}")
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import queue
+import threading
+from concurrent.futures import Future
+import tkinter as tk
+from tkinter import ttk
+import logging
+
+# How often the Tk thread drains a task's message queue
+POLL_MS = 100
+
+class BackgroundTask:
+    """Runs work on a daemon thread and hands its messages back to the Tk thread.
+
+    work is called as work(report, cancel_event). report(*args) may be called
+    from the worker at any time; each call is delivered to on_progress(*args)
+    on the Tk thread. When work returns, on_done(result) is called on the Tk
+    thread, or on_error(exception) if it raised. Tk widgets must only be
+    touched from those callbacks, never from work itself; work that needs a
+    dialog runs it through call_in_main_thread.
+    """
+
+    def __init__(self, widget, work, on_progress=None, on_done=None, on_error=None, name="background"):
+        self.widget = widget
+        self.cancel_event = threading.Event()
+        self._work = work
+        self._on_progress = on_progress
+        self._on_done = on_done
+        self._on_error = on_error
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.finished = False
+
+    def start(self):
+        self._thread.start()
+        self.widget.after(POLL_MS, self._poll)
+        return self
+
+    def cancel(self):
+        """Ask work to stop; it is up to work to check cancel_event between steps."""
+        self.cancel_event.set()
+
+    def call_in_main_thread(self, func, *args, **kwargs):
+        """Run func on the Tk thread and wait for its result, e.g. a modal dialog needed by work."""
+        if threading.current_thread() is threading.main_thread():
+            return func(*args, **kwargs)
+        future = Future()
+        self._queue.put(("call", (future, func, args, kwargs)))
+        return future.result()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def _run(self):
+        try:
+            result = self._work(lambda *args: self._queue.put(("progress", args)), self.cancel_event)
+        except Exception as e:
+            logging.error(f"Background task {self._thread.name} failed: {str(e)}")
+            self._queue.put(("error", e))
+        else:
+            self._queue.put(("done", result))
+
+    def _poll(self):
+        try:
+            while True:
+                kind, payload = self._queue.get_nowait()
+                if kind == "progress":
+                    if self._on_progress:
+                        self._on_progress(*payload)
+                    continue
+                if kind == "call":
+                    future, func, args, kwargs = payload
+                    if future.set_running_or_notify_cancel():
+                        try:
+                            future.set_result(func(*args, **kwargs))
+                        except Exception as e:
+                            future.set_exception(e)
+                    continue
+                self.finished = True
+                if kind == "done" and self._on_done:
+                    self._on_done(payload)
+                elif kind == "error" and self._on_error:
+                    self._on_error(payload)
+                return
+        except queue.Empty:
+            pass
+        except tk.TclError:
+            return  # The window was closed while the task ran
+        self.widget.after(POLL_MS, self._poll)
+
+def set_children_enabled(container, enabled, keep=()):
+    """Enable or disable every input widget under container, except those in keep."""
+    for child in container.winfo_children():
+        if child in keep:
+            continue
+        if isinstance(child, (ttk.Button, ttk.Entry, ttk.Checkbutton, ttk.Radiobutton)):
+            # Combobox and Spinbox are ttk.Entry subclasses; their readonly flag is kept
+            child.state(["!disabled"] if enabled else ["disabled"])
+        elif isinstance(child, (tk.Listbox, tk.Button, tk.Entry)):
+            child.config(state=tk.NORMAL if enabled else tk.DISABLED)
+        elif isinstance(child, (ttk.Frame, tk.Frame, ttk.LabelFrame)):
+            set_children_enabled(child, enabled, keep)
+
+def format_eta(seconds):
+    """Format a remaining-time estimate as m:ss."""
+    seconds = max(0, int(round(seconds)))
+    return f"{seconds // 60}:{seconds % 60:02d}"
@@ -0,0 +1,289 @@
+import bisect
+import tkinter as tk
+from tkinter import ttk
+import logging
+
+# Rows added to the tree at a time as the user scrolls towards the end
+RENDER_CHUNK = 200
+# Load the next chunk once the view is this far down the rendered rows
+RENDER_AHEAD = 0.8
+# Bulk edits touching more rows than this rebuild views once instead of row by row
+BULK_REFRESH_ROWS = 50
+
+class KeyValueModel:
+    """The loaded key/value data, with a sorted key index for lookup and search.
+
+    data is the dict being edited; its insertion order is the order shown in
+    unsorted views. A lower-cased copy of every key and value and a sorted key
+    index are kept up to date on each change, so search does not re-fold or
+    re-sort the data per keystroke. Views registered with add_view are told
+    about changes through refresh(), row_changed(key) and row_removed(key).
+    """
+
+    def __init__(self, data=None):
+        self.data = data if data is not None else {}
+        self._views = []
+        self._folded = {}  # key -> (lower-cased key, lower-cased value)
+        self._index = []  # Sorted (lower-cased key, key)
+        self._last_search = None  # (needle, matching keys in data order)
+        self._reindex()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def add_view(self, view):
+        self._views.append(view)
+
+    def remove_view(self, view):
+        if view in self._views:
+            self._views.remove(view)
+
+    def set(self, key, value):
+        """Add or update one pair; returns False if key already held value.
+
+        An edited key moves to the end, as it always has in the manual dialog.
+        """
+        if key in self.data and self.data[key] == value:
+            return False
+        if key in self.data:
+            self._drop(key)
+            self._notify("row_removed", key)
+        self._put(key, value)
+        self._notify("row_changed", key)
+        return True
+
+    def remove(self, key):
+        if key not in self.data:
+            return False
+        self._drop(key)
+        self._notify("row_removed", key)
+        return True
+
+    def update(self, pairs):
+        """Apply many (key, value) pairs as one edit; returns the keys that changed."""
+        changed = []
+        for key, value in pairs:
+            if key in self.data and self.data[key] == value:
+                continue
+            if key in self.data:
+                self._drop(key)
+            self._put(key, value)
+            changed.append(key)
+        if len(changed) > BULK_REFRESH_ROWS:
+            self._notify("refresh")
+        else:
+            for key in changed:
+                self._notify("row_removed", key)
+                self._notify("row_changed", key)
+        logging.debug(f"Bulk edit changed {len(changed)} key(s)")
+        return changed
+
+    def replace(self, data):
+        """Swap in freshly loaded data, keeping the same dict object for its other users."""
+        self.data.clear()
+        self.data.update(data)
+        self._reindex()
+        self._notify("refresh")
+
+    def search(self, text):
+        """Return the keys whose key or value contains text, ignoring case.
+
+        Keys starting with text come first, in key order, found by bisecting
+        the key index; the other matches follow in data order. Typing more
+        characters narrows the previous result instead of scanning all keys.
+        """
+        needle = text.strip().lower()
+        if not needle:
+            return list(self.data)
+        if self._last_search and needle.startswith(self._last_search[0]):
+            candidates = self._last_search[1]
+        else:
+            candidates = self.data
+        matches = [key for key in candidates if self._matches(key, needle)]
+        self._last_search = (needle, matches)
+
+        prefixed = []
+        position = bisect.bisect_left(self._index, (needle,))
+        while position < len(self._index) and self._index[position][0].startswith(needle):
+            prefixed.append(self._index[position][1])
+            position += 1
+        first = set(prefixed)
+        return prefixed + [key for key in matches if key not in first]
+
+    def matches(self, key, text):
+        needle = text.strip().lower()
+        return key in self.data and (not needle or self._matches(key, needle))
+
+    def _matches(self, key, needle):
+        folded_key, folded_value = self._folded[key]
+        return needle in folded_key or needle in folded_value
+
+    def _put(self, key, value):
+        self.data[key] = value
+        self._folded[key] = (key.lower(), str(value).lower())
+        bisect.insort(self._index, (key.lower(), key))
+        self._last_search = None
+
+    def _drop(self, key):
+        del self.data[key]
+        folded_key, _ = self._folded.pop(key)
+        del self._index[bisect.bisect_left(self._index, (folded_key, key))]
+        self._last_search = None
+
+    def _reindex(self):
+        self._folded = {key: (key.lower(), str(value).lower()) for key, value in self.data.items()}
+        self._index = sorted((folded_key, key) for key, (folded_key, _) in self._folded.items())
+        self._last_search = None
+
+    def _notify(self, method, *args):
+        for view in list(self._views):
+            getattr(view, method)(*args)
+
+class DataPreview(ttk.Frame):
+    """Sortable, filterable Treeview view of a KeyValueModel.
+
+    Rows are shown in the model's order, sorted by a clicked column or
+    narrowed by the filter box (the model's search). Only the first rows are
+    put in the tree; more are added in chunks as the user scrolls, so showing
+    thousands of keys costs a few hundred Tk inserts. Edits to the model are
+    applied as single-row diffs instead of re-rendering everything.
+    """
+
+    def __init__(self, parent, model, height=10):
+        super().__init__(parent)
+        self.model = model
+        self._rows = []  # Keys passing the filter, in display order
+        self._visible = set()  # The same keys, for membership tests
+        self._shown = 0  # How many of _rows are in the tree
+        self._sort_column = None
+        self._sort_descending = False
+
+        self.filter_var = tk.StringVar()
+        ttk.Label(self, text="Filter:").grid(row=0, column=0, sticky=tk.W)
+        ttk.Entry(self, textvariable=self.filter_var).grid(row=0, column=1, sticky=tk.EW, pady=(0, 2))
+        self.filter_var.trace_add("write", lambda *args: self.refresh())
+
+        self.tree = ttk.Treeview(self, columns=("key", "value"), show="headings", height=height, selectmode="browse")
+        for column, title in (("key", "Key"), ("value", "Value")):
+            self.tree.heading(column, text=title, command=lambda c=column: self.sort_by(c))
+        self.tree.column("key", width=220, stretch=False)
+        self.tree.column("value", width=300)
+        self.tree.tag_configure("blue", foreground="blue")
+        self.tree.tag_configure("error", foreground="red")
+        self.tree.grid(row=1, column=0, columnspan=2, sticky=tk.NSEW)
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.scrollbar.grid(row=1, column=2, sticky=tk.NS)
+        self.tree.config(yscrollcommand=self._on_scroll)
+
+        self.columnconfigure(1, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        model.add_view(self)
+        self.bind("<Destroy>", self._on_destroy)
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the view from the model, e.g. after a new file was loaded."""
+        self.tree.delete(*self.tree.get_children())
+        self._rows = self.model.search(self.filter_var.get())
+        if self._sort_column is not None:
+            self._rows.sort(key=self._sort_key, reverse=self._sort_descending)
+        self._visible = set(self._rows)
+        self._shown = 0
+        self._render_more()
+        logging.debug(f"Preview refreshed: {len(self._rows)} of {len(self.model)} rows match")
+
+    def row_changed(self, key):
+        """Show a key that was added to the model or whose value changed."""
+        visible = self.model.matches(key, self.filter_var.get())
+        if key in self._visible:
+            # Only the value changed position when sorting by value; otherwise update in place
+            if visible and self._sort_column != "value":
+                if self.tree.exists(key):
+                    value = self.model.data[key]
+                    self.tree.item(key, values=(key, value), tags=self._tags(key, value))
+                return
+            self.row_removed(key)
+        if visible:
+            self._insert(key)
+
+    def row_removed(self, key):
+        """Drop a key that was removed from the model."""
+        if key not in self._visible:
+            return
+        index = self._rows.index(key)
+        del self._rows[index]
+        self._visible.discard(key)
+        if index < self._shown:
+            self.tree.delete(key)
+            self._shown -= 1
+
+    def show_error(self, message):
+        """Replace the rows with a single error line until the next refresh."""
+        self.tree.delete(*self.tree.get_children())
+        self._rows = []
+        self._visible = set()
+        self._shown = 0
+        self.tree.insert("", tk.END, values=("Error", message), tags=("error",))
+
+    def sort_by(self, column):
+        """Sort by column; clicking the same column again reverses the order."""
+        if self._sort_column == column:
+            self._sort_descending = not self._sort_descending
+        else:
+            self._sort_column = column
+            self._sort_descending = False
+        arrow = " ▼" if self._sort_descending else " ▲"
+        for name, title in (("key", "Key"), ("value", "Value")):
+            self.tree.heading(name, text=title + (arrow if name == column else ""))
+        self.refresh()
+
+    def selected_key(self):
+        selection = self.tree.selection()
+        return selection[0] if selection and selection[0] in self.model else None
+
+    def _insert(self, key):
+        if self._sort_column is None:
+            index = len(self._rows)
+        else:
+            keys = [self._sort_key(row) for row in self._rows]
+            if self._sort_descending:
+                index = len(keys) - bisect.bisect_right(keys[::-1], self._sort_key(key))
+            else:
+                index = bisect.bisect_right(keys, self._sort_key(key))
+        self._rows.insert(index, key)
+        self._visible.add(key)
+        # Rows past the rendered part are added when the user scrolls to them
+        if index <= self._shown:
+            value = self.model.data[key]
+            self.tree.insert("", index, iid=key, values=(key, value), tags=self._tags(key, value))
+            self._shown += 1
+
+    def _render_more(self):
+        end = min(len(self._rows), self._shown + RENDER_CHUNK)
+        for key in self._rows[self._shown:end]:
+            value = self.model.data.get(key, "")
+            self.tree.insert("", tk.END, iid=key, values=(key, value), tags=self._tags(key, value))
+        self._shown = end
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._shown < len(self._rows) and float(last) >= RENDER_AHEAD:
+            # Called from inside Tk's scroll handling, so add rows once it returns
+            self.after_idle(self._render_more)
+
+    def _on_destroy(self, event):
+        # <Destroy> is also delivered for each child widget
+        if event.widget is self:
+            self.model.remove_view(self)
+
+    def _sort_key(self, key):
+        return str(self.model.data.get(key, "") if self._sort_column == "value" else key).lower()
+
+    @staticmethod
+    def _tags(key, value):
+        return ("blue",) if key.startswith("New_") or str(value).startswith("New_") else ()
@@ -1,26 +1,29 @@
 import os
-import tempfile
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import shutil
 import platform
 import subprocess
-import pandas as pd
-from services.excel_parser import read_excel_data
+from services.excel_parser import read_excel_data, read_excel_records, select_sheet, open_workbook
 from utils.formatter import sanitize_key, format_value
-from services.word_filler import fill_word_template
-from services.pdf_filler import fill_pdf_template, get_pdftk_path  # Import get_pdftk_path
-from services.docx_to_pdf import convert_docx_to_pdf
-import logging
-from fdfgen import forge_fdf
+from services.pdf_filler import PDF_ENGINES
+from services.generation import GenerationEngine, DEFAULT_WORKERS, CANCELLED
+from gui.background import BackgroundTask, set_children_enabled, format_eta
+from gui.data_view import DataPreview, KeyValueModel
+from services.workbook_cache import clear_workbook_cache
+from services.merge_policy import MERGE_POLICIES
+from services.data_sources import DATA_FILE_TYPES, CLIENT_KEY, is_excel_file, load_records, parse_pasted_pairs
 import time
+import logging
+
+# Template list colours for each finished template's status
+STATUS_COLOURS = {"ok": "dark green", "failed": "red", "cancelled": "gray"}
 
-# Log to a local drive
-logging.basicConfig(
-    filename=os.path.join(os.path.expanduser("~"), "Documents", "document_filler.log"),
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+
+# Reused across clicks so worker processes keep their template caches warm
+_generation_engine = None
+# (task, progress bar) of the data load in progress, if any
+_current_load = None
 
 def create_document_filler_tab(notebook):
     frame = ttk.Frame(notebook, padding=10)
@@ -29,16 +32,24 @@ def create_document_filler_tab(notebook):
     excel_path_var = tk.StringVar()
     output_dir_var = tk.StringVar()
     nrows_var = tk.StringVar(value="")
+    pdf_engine_var = tk.StringVar(value=PDF_ENGINES[0])
+    workers_var = tk.IntVar(value=DEFAULT_WORKERS)
+    merge_policy_var = tk.StringVar(value="interactive")
     status_text_var = tk.StringVar(value="Ready")
     template_paths = []
     loaded_data = {}  # Single dictionary for all data
+    model = KeyValueModel(loaded_data)
 
     # Excel File input
     ttk.Label(frame, text="Excel File:").grid(row=0, column=0, sticky=tk.W)
+    ttk.Label(frame, text="On Conflict:").grid(row=0, column=2, sticky=tk.E, padx=(0, 5))
+    ttk.Combobox(frame, textvariable=merge_policy_var, values=[policy for policy in MERGE_POLICIES if policy != "sheet-priority"],
+                 state='readonly', width=12).grid(row=0, column=3, sticky=tk.W)
     excel_entry = ttk.Entry(frame, textvariable=excel_path_var, width=50)
     excel_entry.grid(row=1, column=0, columnspan=2, sticky=tk.EW, padx=(0, 5))
     ttk.Button(frame, text="Browse...",
-               command=lambda: browse_excel(excel_path_var, preview_text, nrows_var, status_text_var, frame, loaded_data, notebook)).grid(row=1, column=2, padx=(0, 5))
+               command=lambda: browse_excel(excel_path_var, preview, nrows_var, status_text_var, frame, notebook,
+                                            merge_policy_var.get())).grid(row=1, column=2, padx=(0, 5))
     ttk.Button(frame, text="Copy Excel Template...",
                command=lambda: copy_excel_template(status_text_var)).grid(row=1, column=3)
 
@@ -51,10 +62,14 @@ def create_document_filler_tab(notebook):
                command=lambda: add_templates(template_paths, template_listbox)).grid(row=4, column=0, pady=5)
     ttk.Button(frame, text="Remove Selected",
                command=lambda: remove_templates(template_paths, template_listbox)).grid(row=4, column=1)
+    ttk.Label(frame, text="PDF Engine:").grid(row=4, column=2, sticky=tk.E, padx=(0, 5))
+    ttk.Combobox(frame, textvariable=pdf_engine_var, values=PDF_ENGINES, state='readonly', width=8).grid(row=4, column=3, sticky=tk.W)
 
     # Rows to read input
     ttk.Label(frame, text="Rows to Read (blank for all rows):").grid(row=5, column=0, sticky=tk.W, pady=(10, 0))
     ttk.Entry(frame, textvariable=nrows_var, width=10).grid(row=5, column=1, sticky=tk.W)
+    ttk.Label(frame, text="Workers:").grid(row=5, column=2, sticky=tk.E, padx=(0, 5), pady=(10, 0))
+    ttk.Spinbox(frame, textvariable=workers_var, from_=1, to=64, width=6).grid(row=5, column=3, sticky=tk.W, pady=(10, 0))
 
     # Output folder input
     ttk.Label(frame, text="Output Folder:").grid(row=6, column=0, sticky=tk.W, pady=(10, 0))
@@ -65,20 +80,26 @@ def create_document_filler_tab(notebook):
     # Loaded Data and Modify Data Manually
     ttk.Label(frame, text="Loaded Data:").grid(row=8, column=0, sticky=tk.W, pady=(10, 0))
     ttk.Button(frame, text="Modify Data Manually",
-               command=lambda: open_manual_data_dialog(loaded_data, preview_text, status_text_var, frame)).grid(row=8, column=3, columnspan=4, sticky=tk.EW, pady=(10, 0))
+               command=lambda: open_manual_data_dialog(model, status_text_var, frame)).grid(row=8, column=3, columnspan=4, sticky=tk.EW, pady=(10, 0))
 
-    preview_text = tk.Text(frame, height=10, state='disabled', wrap='none', width=50)
-    preview_text.grid(row=9, column=0, rowspan=2, columnspan=3, sticky=tk.NSEW)
-    scrollbar = ttk.Scrollbar(frame, orient='vertical', command=preview_text.yview)
-    scrollbar.grid(row=9, column=3, rowspan=2, sticky=tk.NS)
-    preview_text.config(yscrollcommand=scrollbar.set)
-    preview_text.tag_configure("blue", foreground="blue")
+    preview = DataPreview(frame, model)
+    preview.grid(row=9, column=0, rowspan=2, columnspan=4, sticky=tk.NSEW)
 
     ttk.Button(frame, text="Generate Documents",
             command=lambda: process_documents(
-                excel_path_var.get(), template_paths, output_dir_var.get(), status_text_var, frame, loaded_data
+                excel_path_var.get(), template_paths, output_dir_var.get(), status_text_var, frame, loaded_data,
+                pdf_engine_var.get(), read_workers(workers_var), template_listbox
             )).grid(row=11, column=0, columnspan=1, sticky='ew', padx=5, pady=10)
 
+    ttk.Button(frame, text="Batch Generate...",
+            command=lambda: process_batch(
+                template_paths, output_dir_var.get(), nrows_var, status_text_var, frame,
+                pdf_engine_var.get(), read_workers(workers_var), template_listbox
+            )).grid(row=12, column=0, columnspan=1, sticky='ew', padx=5)
+
+    ttk.Button(frame, text="Clear Excel Cache",
+            command=lambda: clear_excel_cache(status_text_var)).grid(row=12, column=3, sticky='ew')
+
     # Status label
     ttk.Label(frame, textvariable=status_text_var).grid(row=11, column=1, columnspan=5, sticky='ew', padx=5, pady=10)
 
@@ -88,39 +109,115 @@ def create_document_filler_tab(notebook):
 
     return frame
 
-def browse_excel(excel_path_var, preview_text, nrows_var, status_text_var, frame, loaded_data, parent):
+def read_workers(workers_var):
+    """Return the worker count from the spinbox, falling back to the default."""
+    try:
+        return max(1, int(workers_var.get()))
+    except (tk.TclError, ValueError):
+        return DEFAULT_WORKERS
+
+def browse_excel(excel_path_var, preview, nrows_var, status_text_var, frame, parent, merge_policy="interactive"):
+    global _current_load
     default_dir = os.path.join(os.path.expanduser("~"), "Downloads")
-    path = filedialog.askopenfilename(initialdir=default_dir, filetypes=[("Excel Files", "*.xlsx *.xlsm")])
-    if path:
-        excel_path_var.set(path)
-        progress = ttk.Progressbar(frame, mode='indeterminate')
-        progress.grid(row=13, column=0, columnspan=4, pady=5)
-        progress.start()
-        try:
-            nrows_str = nrows_var.get().strip()
-            limit = int(nrows_str) if nrows_str else None
-            loaded_data.clear()  # Clear existing data
-            loaded_data.update(read_excel_data(path, limit, parent=parent))
-
-            # Update preview with loaded data
-            update_preview(preview_text, loaded_data)
-            status_text_var.set("Excel data loaded and preview updated")
-        except Exception as e:
-            status_text_var.set(f"Error reading Excel: {str(e)}")
-            preview_text.config(state='normal')
-            preview_text.delete(1.0, tk.END)
-            preview_text.insert(tk.END, f"Error: {e}")
-            preview_text.config(state='disabled')
-            logging.error(f"Excel read error: {str(e)}")
-        finally:
-            progress.stop()
-            progress.destroy()
-
-def open_manual_data_dialog(loaded_data, preview_text, status_text_var, parent):
+    path = filedialog.askopenfilename(initialdir=default_dir, filetypes=DATA_FILE_TYPES)
+    if not path:
+        return
+    try:
+        nrows_str = nrows_var.get().strip()
+        limit = int(nrows_str) if nrows_str else None
+    except ValueError:
+        status_text_var.set("Rows to Read must be a whole number")
+        return
+
+    # A new load supersedes the one still running; its result is discarded
+    if _current_load is not None:
+        _current_load[0].cancel()
+        _current_load[1].destroy()
+        logging.debug("Superseded the previous data load")
+
+    excel_path_var.set(path)
+    status_text_var.set(f"Loading {os.path.basename(path)}...")
+    progress = ttk.Progressbar(frame, mode='indeterminate')
+    progress.grid(row=13, column=0, columnspan=4, pady=5)
+    progress.start()
+
+    def work(report, cancel_event):
+        # Sheet, conflict and client dialogs are Tk windows, so they run on the main thread
+        if is_excel_file(path):
+            return read_excel_data(path, limit, parent=parent, merge_policy=merge_policy,
+                                   run_dialog=task.call_in_main_thread, cancel_event=cancel_event)
+        return load_data_source_record(path, parent, task.call_in_main_thread)
+
+    def is_current():
+        return _current_load is not None and _current_load[0] is task
+
+    def finish():
+        global _current_load
+        _current_load = None
+        progress.stop()
+        progress.destroy()
+
+    def on_done(data):
+        if not is_current():
+            return
+        finish()
+        if data is None:
+            status_text_var.set("Loading cancelled")
+            return
+        # Replaces the data in place and refreshes every view of it
+        preview.model.replace(data)
+        status_text_var.set("Data loaded and preview updated")
+
+    def on_error(e):
+        if not is_current():
+            return
+        finish()
+        status_text_var.set(f"Error reading Excel: {str(e)}")
+        preview.show_error(str(e))
+        logging.error(f"Excel read error: {str(e)}")
+
+    task = BackgroundTask(frame, work, on_done=on_done, on_error=on_error, name="load-data")
+    _current_load = (task, progress)
+    task.start()
+
+def load_data_source_record(path, parent, run_dialog=None):
+    """Load one client from a CSV, JSON or SQLite file, asking which client if it holds several.
+
+    run_dialog(func, *args) runs the client prompt on the Tk thread when this
+    is called from a background thread.
+    """
+    run_dialog = run_dialog or (lambda func, *args, **kwargs: func(*args, **kwargs))
+    client_number = None
+    if path.lower().endswith((".db", ".sqlite", ".sqlite3")):
+        # Query a single client instead of reading the whole table
+        client_number = run_dialog(simpledialog.askstring, "Client", f"Enter the {CLIENT_KEY} to load:", parent=parent)
+        if not client_number:
+            return None
+    records = load_records(path, client_number.strip() if client_number else None)
+    if len(records) > 1:
+        client_number = run_dialog(
+            simpledialog.askstring, "Client", f"The file holds {len(records)} clients. Enter the {CLIENT_KEY} to load:", parent=parent)
+        if not client_number:
+            return None
+        records = [record for record in records if record.get(CLIENT_KEY) == client_number.strip()]
+    if not records:
+        raise ValueError(f"No client {client_number} in {os.path.basename(path)}" if client_number else "No data found")
+    return records[0]
+
+def clear_excel_cache(status_text_var):
+    """Forget every cached workbook so the next load re-reads the Excel file."""
+    try:
+        removed = clear_workbook_cache()
+        status_text_var.set(f"Cleared {removed} cached workbook(s)")
+    except Exception as e:
+        status_text_var.set(f"Error clearing cache: {str(e)}")
+        logging.error(f"Workbook cache clear error: {str(e)}")
+
+def open_manual_data_dialog(model, status_text_var, parent):
     """Open a dialog for adding, editing, and removing key-value pairs."""
     dialog = tk.Toplevel(parent)
     dialog.title("Modify Data Manually")
-    dialog.geometry("400x400")
+    dialog.geometry("520x480")
     dialog.transient(parent)
     dialog.grab_set()
 
@@ -137,63 +234,39 @@ def open_manual_data_dialog(loaded_data, preview_text, status_text_var, parent):
     ttk.Entry(frame, textvariable=value_entry, width=30).grid(row=3, column=0, columnspan=2, sticky=tk.EW, padx=(0, 5))
 
     ttk.Button(frame, text="Add/Edit Key-Value",
-               command=lambda: modify_manual_entry(key_entry, value_entry, loaded_data, preview_text, status_text_var)).grid(row=4, column=0, pady=5)
-    ttk.Button(frame, text="Refresh",
-               command=lambda: refresh_manual_listbox(manual_listbox, loaded_data)).grid(row=4, column=2, pady=5)
-
-    # Manual data listbox
-    manual_listbox = tk.Listbox(frame, height=10, width=40, selectmode=tk.SINGLE)
-    manual_listbox.grid(row=5, column=0, columnspan=2, sticky=tk.NSEW)
-    manual_scrollbar = ttk.Scrollbar(frame, orient='vertical', command=manual_listbox.yview)
-    manual_scrollbar.grid(row=5, column=2, sticky=tk.NS)
-    manual_listbox.config(yscrollcommand=manual_scrollbar.set)
+               command=lambda: modify_manual_entry(key_entry, value_entry, model, status_text_var)).grid(row=4, column=0, pady=5)
+    ttk.Button(frame, text="Paste Pairs...",
+               command=lambda: paste_manual_entries(model, status_text_var, dialog)).grid(row=4, column=1, pady=5)
+    ttk.Button(frame, text="Import...",
+               command=lambda: import_manual_entries(model, status_text_var, dialog)).grid(row=4, column=2, pady=5)
 
-    # Populate listbox with current loaded data
-    for key, value in loaded_data.items():
-        manual_listbox.insert(tk.END, f"{key}: {value}")
+    # Same model as the main preview, so both views follow every edit
+    manual_view = DataPreview(frame, model)
+    manual_view.grid(row=5, column=0, columnspan=3, sticky=tk.NSEW)
 
     # Populate entry fields on selection
     def on_select(event):
-        if not manual_listbox.curselection():
+        key = manual_view.selected_key()
+        if key is None:
             return
-        index = manual_listbox.curselection()[0]
-        key_value = manual_listbox.get(index).split(": ")
-        key_entry.set(key_value[0])
-        value_entry.set(key_value[1] if len(key_value) > 1 else "")
+        key_entry.set(key)
+        value_entry.set(model.data[key])
 
-    manual_listbox.bind("<<ListboxSelect>>", on_select)
+    manual_view.tree.bind("<<TreeviewSelect>>", on_select)
 
     ttk.Button(frame, text="Remove Selected",
-               command=lambda: remove_manual_entry(loaded_data, manual_listbox, preview_text, status_text_var)).grid(row=6, column=0, pady=5)
+               command=lambda: remove_manual_entry(model, manual_view, status_text_var)).grid(row=6, column=0, pady=5)
 
     # Save data button
     ttk.Button(frame, text="Save Data",
-               command=lambda: save_data(loaded_data, status_text_var)).grid(row=6, column=1, pady=5)
+               command=lambda: save_data(model.data, status_text_var)).grid(row=6, column=1, pady=5)
 
     frame.columnconfigure(0, weight=1)
     frame.rowconfigure(5, weight=1)
     dialog.wait_window()
 
-def refresh_manual_listbox(listbox, loaded_data):
-    """Refresh the manual listbox with the current loaded_data."""
-    listbox.delete(0, tk.END)
-    for key, value in loaded_data.items():
-        listbox.insert(tk.END, f"{key}: {value}")
-    logging.debug("Manual listbox refreshed with loaded data")
-
-def update_preview(preview_text, loaded_data):
-    """Update the preview with loaded data."""
-    preview_text.config(state='normal')
-    preview_text.delete(1.0, tk.END)
-    preview_text.insert(tk.END, "Key".ljust(30) + "Value\n" + "-"*60 + "\n")
-    for key, value in loaded_data.items():
-        preview_text.insert(tk.END, f"{str(key).ljust(30)} ", "blue" if key.startswith("New_") else None)
-        preview_text.insert(tk.END, f"{value}\n", "blue" if value.startswith("New_") else None)
-    preview_text.config(state='disabled')
-    logging.debug("Preview updated with loaded data")
-
-def modify_manual_entry(key_entry, value_entry, loaded_data, preview_text, status_text_var):
-    """Add or update a key-value pair in loaded_data."""
+def modify_manual_entry(key_entry, value_entry, model, status_text_var):
+    """Add or update a key-value pair in the loaded data."""
     key = key_entry.get().strip()
     value = value_entry.get().strip()
     if not key:
@@ -202,30 +275,81 @@ def modify_manual_entry(key_entry, value_entry, loaded_data, preview_text, statu
         return
     sanitized_key = sanitize_key(key)
     formatted_value = format_value(value)
-    if sanitized_key in loaded_data and loaded_data[sanitized_key] == formatted_value:
+    if not model.set(sanitized_key, formatted_value):
         status_text_var.set("No change detected")
-        update_preview(preview_text, loaded_data)  # Ensure preview updates even if no change
         return
-    if sanitized_key in loaded_data:
-        del loaded_data[sanitized_key]
-    loaded_data[sanitized_key] = formatted_value
     key_entry.set("")
     value_entry.set("")
-    update_preview(preview_text, loaded_data)  # Update preview after modification
     status_text_var.set("Key-value pair added/updated")
     logging.debug(f"Modified key-value: {sanitized_key}={formatted_value}")
 
-def remove_manual_entry(loaded_data, manual_listbox, preview_text, status_text_var):
-    """Remove selected key-value pair from loaded_data."""
-    if not manual_listbox.curselection():
+def paste_manual_entries(model, status_text_var, parent):
+    """Let the user paste many key-value lines and apply them as one edit."""
+    dialog = tk.Toplevel(parent)
+    dialog.title("Paste Key-Value Pairs")
+    dialog.geometry("420x320")
+    dialog.transient(parent)
+    dialog.grab_set()
+
+    frame = ttk.Frame(dialog, padding=10)
+    frame.pack(fill=tk.BOTH, expand=True)
+    ttk.Label(frame, text="One pair per line: key and value separated by a tab, \": \", \"=\" or \",\"").grid(row=0, column=0, sticky=tk.W)
+    text = tk.Text(frame, height=12, wrap='none')
+    text.grid(row=1, column=0, sticky=tk.NSEW)
+
+    def apply():
+        pairs = parse_pasted_pairs(text.get("1.0", tk.END))
+        changed = model.update(pairs)
+        status_text_var.set(f"Pasted {len(pairs)} pair(s), {len(changed)} changed")
+        dialog.destroy()
+
+    ttk.Button(frame, text="Apply", command=apply).grid(row=2, column=0, pady=5)
+    frame.columnconfigure(0, weight=1)
+    frame.rowconfigure(1, weight=1)
+    text.focus_set()
+    dialog.wait_window()
+
+def import_manual_entries(model, status_text_var, parent):
+    """Merge the pairs of another data file into the loaded data as one edit.
+
+    The file is read on a background thread; its sheet, conflict and client
+    dialogs run on the Tk thread, as when loading data.
+    """
+    default_dir = os.path.join(os.path.expanduser("~"), "Downloads")
+    path = filedialog.askopenfilename(parent=parent, initialdir=default_dir, filetypes=DATA_FILE_TYPES)
+    if not path:
+        return
+    status_text_var.set(f"Importing {os.path.basename(path)}...")
+
+    def work(report, cancel_event):
+        if is_excel_file(path):
+            return read_excel_data(path, parent=parent, run_dialog=task.call_in_main_thread, cancel_event=cancel_event)
+        return load_data_source_record(path, parent, task.call_in_main_thread)
+
+    def on_done(record):
+        if record is None:
+            status_text_var.set("Import cancelled")
+            return
+        # The model is only changed here, on the Tk thread
+        changed = model.update(record.items())
+        status_text_var.set(f"Imported {len(record)} pair(s) from {os.path.basename(path)}, {len(changed)} changed")
+
+    def on_error(e):
+        status_text_var.set("Error importing data")
+        messagebox.showerror("Error", f"Failed to import data: {str(e)}", parent=parent)
+        logging.error(f"Manual import error: {str(e)}")
+
+    task = BackgroundTask(parent, work, on_done=on_done, on_error=on_error, name="import-data")
+    task.start()
+
+def remove_manual_entry(model, manual_view, status_text_var):
+    """Remove the selected key-value pair from the loaded data."""
+    key = manual_view.selected_key()
+    if key is None:
         status_text_var.set("No key-value pair selected")
         messagebox.showerror("Error", "Please select a key-value pair to remove")
         return
-    key_value = manual_listbox.get(manual_listbox.curselection()[0]).split(": ")
-    key = key_value[0]
-    del loaded_data[key]
-    manual_listbox.delete(manual_listbox.curselection()[0])
-    update_preview(preview_text, loaded_data)
+    model.remove(key)
     status_text_var.set("Key-value pair removed")
     logging.debug(f"Removed key-value: {key}")
 
@@ -235,7 +359,8 @@ def save_data(loaded_data, status_text_var):
         messagebox.showerror("No Data", "No data to save")
         return
 
-    # Convert to DataFrame
+    # Convert to DataFrame; pandas is only loaded when data is saved
+    import pandas as pd
     df = pd.DataFrame(list(loaded_data.items()), columns=['Key', 'Value'])
 
     # File dialog for saving
@@ -364,7 +489,81 @@ def browse_output(output_dir_var):
         output_dir_var.set(folder)
         logging.debug(f"Selected output directory: {folder}")
 
-def process_documents(excel_path, template_paths, output_dir, status_text_var, frame, loaded_data):
+def get_generation_engine(workers):
+    """Return the session's generation engine, recreating it if the worker count changed."""
+    global _generation_engine
+    if _generation_engine is None or _generation_engine.workers != workers:
+        if _generation_engine is not None:
+            _generation_engine.shutdown(wait=False)
+        _generation_engine = GenerationEngine(workers=workers)
+    return _generation_engine
+
+def run_generation_job(frame, template_listbox, template_paths, status_text_var, work, on_done):
+    """Run a generation job in the background while the window stays responsive.
+
+    work(report, cancel_event) runs on a worker thread and passes report as the
+    engine's progress callback. The tab's inputs are disabled and a Cancel
+    button is shown until the job ends; each finished template is coloured in
+    the template list and the status line shows progress and the time left.
+    on_done(result) runs on the Tk thread with whatever work returned.
+    """
+    progress = ttk.Progressbar(frame, mode='determinate')
+    progress.grid(row=13, column=0, columnspan=3, sticky=tk.EW, pady=5)
+    cancel_button = ttk.Button(frame, text="Cancel")
+    cancel_button.grid(row=13, column=3, pady=5)
+    if template_listbox is not None:
+        for index in range(template_listbox.size()):
+            template_listbox.itemconfig(index, foreground="")
+    set_children_enabled(frame, False, keep=(cancel_button,))
+    start_time = time.time()
+
+    def on_progress(done, total, result):
+        progress['maximum'] = total
+        progress['value'] = done
+        if result.error == CANCELLED:
+            status = "cancelled"
+        else:
+            status = "ok" if result.ok else "failed"
+        if template_listbox is not None and result.template_path in template_paths:
+            template_listbox.itemconfig(template_paths.index(result.template_path), foreground=STATUS_COLOURS[status])
+        remaining = (time.time() - start_time) / done * (total - done)
+        status_text_var.set(f"Generated {done}/{total}: {os.path.basename(result.template_path)} - about {format_eta(remaining)} left")
+
+    def finish():
+        progress.destroy()
+        cancel_button.destroy()
+        set_children_enabled(frame, True)
+
+    def on_finished(result):
+        finish()
+        if task.cancelled:
+            status_text_var.set("Generation cancelled; templates already started were finished")
+        on_done(result)
+
+    def on_error(error):
+        finish()
+        status_text_var.set("Error during generation")
+        messagebox.showerror("Error", str(error))
+
+    def on_cancel():
+        task.cancel()
+        cancel_button.state(["disabled"])
+        status_text_var.set("Cancelling after the templates in progress...")
+
+    cancel_button.config(command=on_cancel)
+    task = BackgroundTask(frame, work, on_progress, on_finished, on_error, name="generate")
+    return task.start()
+
+def open_folder(folder):
+    if platform.system() == "Windows":
+        os.startfile(folder)
+    elif platform.system() == "Darwin":
+        subprocess.run(["open", folder], check=True)
+    else:
+        subprocess.run(["xdg-open", folder], check=True)
+
+def process_documents(excel_path, template_paths, output_dir, status_text_var, frame, loaded_data, pdf_engine="pdftk",
+                      workers=DEFAULT_WORKERS, template_listbox=None):
     if not excel_path or not template_paths or not output_dir:
         messagebox.showerror("Missing Input", "Please select all inputs")
         return
@@ -373,93 +572,117 @@ def process_documents(excel_path, template_paths, output_dir, status_text_var, f
         messagebox.showerror("No Data", "Please load an Excel file or add manual data first")
         return
 
-    progress = ttk.Progressbar(frame, maximum=len(template_paths), mode='determinate')
-    progress.grid(row=13, column=0, columnspan=4, pady=5)
+    data = loaded_data.copy()  # Use loaded_data directly
+    templates = list(template_paths)
+    engine = get_generation_engine(workers)
 
-    try:
-        data = loaded_data.copy()  # Use loaded_data directly
-
-        # Get client number and task for folder naming
-        client_number = data.get("Client_Number", "output")
-        task = data.get("Task", "output")
-        task = task.replace(" ", "_")
-        folder_name = f"{task}_{client_number}"
-        client_folder = os.path.join(output_dir, folder_name)
-        originals_folder = os.path.join(client_folder, "originals")
-        os.makedirs(client_folder, exist_ok=True)
-        os.makedirs(originals_folder, exist_ok=True)
-
-        for i, template in enumerate(template_paths):
-            name = os.path.basename(template)
-            base_name = os.path.splitext(name.replace("_template", ""))[0]
-            output_name = base_name
-            for key, value in data.items():
-                sanitized_value = value.replace(" ", "_")
-                output_name = output_name.replace(key, sanitized_value)
-            
-            if template.lower().endswith(".docx"):
-                docx_path = os.path.join(originals_folder, f"{output_name}.docx")
-                pdf_path = os.path.join(client_folder, f"{output_name}.pdf")
-                fill_word_template(template, data, docx_path)
-                convert_docx_to_pdf(docx_path, pdf_path)
-            elif template.lower().endswith(".pdf"):
-                pdf_path = os.path.join(client_folder, f"{output_name}.pdf")
-                unflattened_pdf_path = os.path.join(originals_folder, f"{output_name}_unflattened.pdf")
-                
-                # Prepare FDF data locally
-                adjusted_data = {}
-                for key, value in data.items():
-                    val_str = str(value)
-                    if key.lower().startswith("check_box") or "checkbox" in key.lower():
-                        adjusted_data[key] = "Yes" if val_str.lower() in ["yes", "true", "on", "1"] else "Off"
-                    else:
-                        adjusted_data[key] = val_str
-                fields = [(key, val) for key, val in adjusted_data.items()]
-                fdf_data = forge_fdf("", fields, [], [], [])
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".fdf") as fdf_file:
-                    fdf_file.write(fdf_data)
-                    fdf_file_path = fdf_file.name
-
-                try:
-                    # Create flattened PDF
-                    cmd_flatten = [get_pdftk_path(), template, "fill_form", fdf_file_path, "output", pdf_path, "flatten"]
-                    logging.debug(f"Running pdftk command for flattened PDF: {' '.join(cmd_flatten)}")
-                    subprocess.run(cmd_flatten, check=True, capture_output=True, text=True)
-                    
-                    # Create unflattened PDF
-                    cmd_unflatten = [get_pdftk_path(), template, "fill_form", fdf_file_path, "output", unflattened_pdf_path]
-                    logging.debug(f"Running pdftk command for unflattened PDF: {' '.join(cmd_unflatten)}")
-                    subprocess.run(cmd_unflatten, check=True, capture_output=True, text=True)
-                    logging.debug(f"Unflattened PDF created at {unflattened_pdf_path}")
-                except Exception as e:
-                    logging.error(f"PDF processing failed: {str(e)}")
-                    raise
-                finally:
-                    for _ in range(3):
-                        try:
-                            os.unlink(fdf_file_path)
-                            break
-                        except OSError:
-                            time.sleep(0.1)
-            
-            progress['value'] = i + 1
-            frame.update()
-
-        # Open the output folder
-        if platform.system() == "Windows":
-            os.startfile(client_folder)
-        elif platform.system() == "Darwin":
-            subprocess.run(["open", client_folder], check=True)
-        else:
-            subprocess.run(["xdg-open", client_folder], check=True)
+    def work(report, cancel_event):
+        return engine.generate(templates, data, output_dir, pdf_engine=pdf_engine, progress_callback=report, cancel_event=cancel_event)
 
-        messagebox.showinfo("Done", f"Files saved to:\n{client_folder}\nWord and PDF originals in: {originals_folder}\nFolder opened")
-        status_text_var.set("Documents created and folder opened")
+    def on_done(packet):
+        client_folder, originals_folder, results = packet
+        failed = [result for result in results if not result.ok and result.error != CANCELLED]
+        cancelled = [result for result in results if result.error == CANCELLED]
+        try:
+            # Open the output folder
+            open_folder(client_folder)
+        except Exception as e:
+            logging.error(f"Could not open {client_folder}: {str(e)}")
+
+        if failed:
+            details = "\n".join(f"{os.path.basename(result.template_path)}: {result.error}" for result in failed)
+            messagebox.showwarning("Done with errors", f"{len(failed)} of {len(results)} templates failed:\n{details}\n\nOther files saved to:\n{client_folder}")
+            status_text_var.set(f"Documents created with {len(failed)} error(s)")
+        elif cancelled:
+            messagebox.showinfo("Cancelled", f"Generation cancelled; {len(cancelled)} of {len(results)} templates were skipped.\nFinished files are in:\n{client_folder}")
+        else:
+            messagebox.showinfo("Done", f"Files saved to:\n{client_folder}\nWord and PDF originals in: {originals_folder}\nFolder opened")
+            status_text_var.set("Documents created and folder opened")
         logging.debug(f"Documents generated in: {client_folder}")
-    except Exception as e:
-        status_text_var.set("Error during generation")
+
+    run_generation_job(frame, template_listbox, templates, status_text_var, work, on_done)
+
+def process_batch(template_paths, output_dir, nrows_var, status_text_var, frame, pdf_engine="pdftk", workers=DEFAULT_WORKERS,
+                  template_listbox=None):
+    """Generate a packet for every client record in one workbook."""
+    if not template_paths or not output_dir:
+        messagebox.showerror("Missing Input", "Please select templates and an output folder first")
+        return
+
+    default_dir = os.path.join(os.path.expanduser("~"), "Downloads")
+    path = filedialog.askopenfilename(title="Select Batch Workbook", initialdir=default_dir, filetypes=[("Excel Files", "*.xlsx *.xlsm")])
+    if not path:
+        return
+    one_per_column = messagebox.askyesnocancel(
+        "Batch Layout",
+        "Is there one client per column?\n\n"
+        "Yes: keys in the first column, one client in each following column.\n"
+        "No: keys in the first row, one client in each following row."
+    )
+    if one_per_column is None:
+        return
+
+    try:
+        nrows_str = nrows_var.get().strip()
+        limit = int(nrows_str) if nrows_str else None
+    except ValueError:
+        status_text_var.set("Rows to Read must be a whole number")
+        return
+
+    # The workbook is read off the Tk thread, as in browse_excel; the sheet dialog runs on it
+    status_text_var.set(f"Loading {os.path.basename(path)}...")
+    progress = ttk.Progressbar(frame, mode='indeterminate')
+    progress.grid(row=13, column=0, columnspan=4, pady=5)
+    progress.start()
+    set_children_enabled(frame, False)
+
+    def load(report, cancel_event):
+        with open_workbook(path) as xls:
+            sheet = task.call_in_main_thread(select_sheet, xls, frame)[0]
+            return read_excel_records(xls, layout="columns" if one_per_column else "rows", sheet_name=sheet, nrows=limit)
+
+    def finish_loading():
+        progress.stop()
+        progress.destroy()
+        set_children_enabled(frame, True)
+
+    def on_loaded(records):
+        finish_loading()
+        if not records:
+            messagebox.showerror("No Data", "No client records found in the selected sheet")
+            return
+        generate_records(records, template_paths, output_dir, status_text_var, frame, pdf_engine, workers, template_listbox)
+
+    def on_load_error(e):
+        finish_loading()
+        status_text_var.set("Error reading batch workbook")
         messagebox.showerror("Error", str(e))
-        logging.error(f"Document generation error: {str(e)}")
-    finally:
-        progress.destroy()
\ No newline at end of file
+        logging.error(f"Batch workbook error: {str(e)}")
+
+    task = BackgroundTask(frame, load, on_done=on_loaded, on_error=on_load_error, name="load-batch")
+    task.start()
+
+def generate_records(records, template_paths, output_dir, status_text_var, frame, pdf_engine, workers, template_listbox):
+    """Generate a packet for each loaded client record in the background."""
+    templates = list(template_paths)
+    engine = get_generation_engine(workers)
+
+    def work(report, cancel_event):
+        return engine.generate_batch(records, templates, output_dir, pdf_engine=pdf_engine, progress_callback=report, cancel_event=cancel_event)
+
+    def on_done(packets):
+        results = [result for _, _, packet_results in packets for result in packet_results]
+        failed = [result for result in results if not result.ok and result.error != CANCELLED]
+        cancelled = [result for result in results if result.error == CANCELLED]
+
+        if failed:
+            messagebox.showwarning("Done with errors", f"Generated {len(packets)} packets in:\n{output_dir}\n{len(failed)} template(s) failed; see the log for details")
+            status_text_var.set(f"Batch done with {len(failed)} error(s)")
+        elif cancelled:
+            messagebox.showinfo("Cancelled", f"Batch cancelled; {len(cancelled)} of {len(results)} documents were skipped.\nFinished files are in:\n{output_dir}")
+        else:
+            messagebox.showinfo("Done", f"Generated {len(packets)} packets in:\n{output_dir}")
+            status_text_var.set(f"Batch of {len(packets)} packets created")
+        logging.debug(f"Batch generated {len(packets)} packets in: {output_dir}")
+
+    run_generation_job(frame, template_listbox, templates, status_text_var, work, on_done)
@@ -1,6 +1,13 @@
+import time
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from services.pdf_field_reader import extract_fields_pdftk, extract_fields_pypdf
+import logging
+from services.pdf_field_reader import iter_fields_pdftk, iter_fields_pypdf
+from gui.background import BackgroundTask
+
+# Fields are sent to a pane in batches of this many, or at least this often
+REPORT_BATCH = 200
+REPORT_SECONDS = 0.2
 
 def create_pdf_fields_tab(parent):
     frame = ttk.Frame(parent, padding=10)
@@ -36,7 +43,64 @@ def create_pdf_fields_tab(parent):
     status_label = ttk.Label(frame, textvariable=status_var)
     status_label.grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(5,0))
 
+    panes = {}  # Extractor name -> its field count, state text and start time
+    running = {}  # Extractor name -> BackgroundTask still running
+
+    def show_status():
+        status_var.set("; ".join(f"{name}: {pane['state']}" for name, pane in panes.items()))
+
+    def start_extractor(name, text_widget, fields, format_field, pdf_file):
+        pane = panes[name] = {"count": 0, "state": "running", "start": time.perf_counter()}
+
+        def work(report, cancel_event):
+            # Send fields in batches so thousands of widgets don't mean thousands of Tk inserts
+            lines = []
+            last_report = time.perf_counter()
+            for field in fields(pdf_file, cancel_event):
+                lines.append(format_field(field))
+                if len(lines) >= REPORT_BATCH or time.perf_counter() - last_report >= REPORT_SECONDS:
+                    report(lines)
+                    lines = []
+                    last_report = time.perf_counter()
+            if lines:
+                report(lines)
+
+        def on_progress(lines):
+            text_widget.config(state='normal')
+            text_widget.insert(tk.END, "".join(lines))
+            text_widget.config(state='disabled')
+            pane["count"] += len(lines)
+            pane["state"] = f"{pane['count']} fields ({time.perf_counter() - pane['start']:.1f}s)"
+            show_status()
+
+        def finish(state, message=None):
+            running.pop(name, None)
+            elapsed = time.perf_counter() - pane["start"]
+            pane["state"] = f"{state} in {elapsed:.1f}s"
+            if message:
+                text_widget.config(state='normal')
+                text_widget.insert(tk.END, message)
+                text_widget.config(state='disabled')
+            logging.debug(f"{name} field extraction {state} in {elapsed:.2f}s")
+            show_status()
+            if not running:
+                extract_btn.state(["!disabled"])
+                cancel_btn.state(["disabled"])
+
+        def on_done(result):
+            if task.cancelled:
+                finish(f"cancelled after {pane['count']} fields")
+            elif pane["count"]:
+                finish(f"{pane['count']} fields")
+            else:
+                finish("no fields", f"No form fields found with {name}.")
+
+        def on_error(e):
+            finish("failed", f"Error: {str(e)}")
 
+        task = BackgroundTask(frame, work, on_progress, on_done, on_error, name=f"{name}-fields")
+        running[name] = task
+        task.start()
 
     # Extraction function
     def extract_fields():
@@ -46,43 +110,32 @@ def create_pdf_fields_tab(parent):
             return
 
         # Clear text fields
-        pdftk_text.config(state='normal')
-        pdftk_text.delete(1.0, tk.END)
-        pypdf_text.config(state='normal')
-        pypdf_text.delete(1.0, tk.END)
-
-        status_var.set("Extracting fields...")
-
-        try:
-            fields_pdftk = extract_fields_pdftk(pdf_file)
-            if fields_pdftk:
-                for name, info in fields_pdftk:
-                    line = f"{name} (Type: {info.get('type', 'Unknown')}, Values: {info.get('values', 'N/A')})\n"
-                    pdftk_text.insert(tk.END, line)
-            else:
-                pdftk_text.insert(tk.END, "No form fields found with pdftk.")
-
-        except Exception as e:
-            pdftk_text.insert(tk.END, f"Error: {str(e)}")
-
-        pdftk_text.config(state='disabled')
-
-        try:
-            fields_pypdf = extract_fields_pypdf(pdf_file)
-            if fields_pypdf:
-                for name in fields_pypdf:
-                    pypdf_text.insert(tk.END, f"{name}\n")
-            else:
-                pypdf_text.insert(tk.END, "No form fields found with pypdf.")
-
-        except Exception as e:
-            pypdf_text.insert(tk.END, f"Error: {str(e)}")
-
-        pypdf_text.config(state='disabled')
-        status_var.set("Extraction complete.")
+        for text_widget in (pdftk_text, pypdf_text):
+            text_widget.config(state='normal')
+            text_widget.delete(1.0, tk.END)
+            text_widget.config(state='disabled')
+
+        extract_btn.state(["disabled"])
+        cancel_btn.state(["!disabled"])
+        panes.clear()
+        # Both tools read the file at the same time; each pane fills as its fields arrive
+        start_extractor("pdftk", pdftk_text, iter_fields_pdftk,
+                        lambda field: f"{field[0]} (Type: {field[1].get('type', 'Unknown')}, Values: {field[1].get('values', 'N/A')})\n",
+                        pdf_file)
+        start_extractor("pypdf", pypdf_text, iter_fields_pypdf, lambda name: f"{name}\n", pdf_file)
+        show_status()
+
+    def cancel_extraction():
+        for task in running.values():
+            task.cancel()
+        cancel_btn.state(["disabled"])
+        status_var.set("Cancelling...")
 
     extract_btn = ttk.Button(frame, text="Extract Fields", command=extract_fields)
-    extract_btn.grid(row=4, column=0, columnspan=2, pady=(10,0))
+    extract_btn.grid(row=4, column=0, pady=(10,0))
+    cancel_btn = ttk.Button(frame, text="Cancel", command=cancel_extraction)
+    cancel_btn.grid(row=4, column=1, pady=(10,0))
+    cancel_btn.state(["disabled"])
 
     # Configure grid weights for resizing nicely
     frame.columnconfigure(0, weight=1)
@@ -1,18 +1,19 @@
-import tkinter as tk
-from tkinter import ttk
 import logging
-import os
-from gui.doc_filler_tab import create_document_filler_tab
-from gui.pdf_field_tab import create_pdf_fields_tab
+import multiprocessing
+import sys
+from utils import startup_profile
+from utils.logging_setup import configure_logging
 
-# Log to a local drive
-logging.basicConfig(
-    filename=os.path.join(os.path.expanduser("~"), "Documents", "document_filler.log"),
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 
 def main():
+    profile = startup_profile.start_profile()
+    configure_logging()
+    # Tk is imported here so the command line can run on machines without a display
+    import tkinter as tk
+    from tkinter import ttk
+    from gui.doc_filler_tab import create_document_filler_tab
+    from gui.pdf_field_tab import create_pdf_fields_tab
+
     logging.debug("Starting Document Filler Tool")
     root = tk.Tk()
     root.title("Document Filler and PDF Tool")
@@ -29,7 +30,16 @@ def main():
     notebook.add(pdf_fields_tab, text="PDF Fields")
 
     logging.debug("GUI initialized")
+    # Heavy libraries are imported by the features that use them; load them once the window is idle
+    root.after_idle(lambda: startup_profile.window_shown(profile))
+    root.after(startup_profile.WARM_DELAY_MS, startup_profile.warm_imports)
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Required for the generation worker processes in the frozen EXE
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        # Any arguments select the headless command line, e.g. "main.py generate ..."
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+    main()
@@ -0,0 +1,165 @@
+import csv
+import itertools
+import json
+import os
+import re
+import sqlite3
+import logging
+from urllib.parse import quote
+from utils.formatter import sanitize_key, format_value
+
+CLIENT_KEY = "Client_Number"
+DEFAULT_TABLE = "clients"
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+# Pasted lines without a tab are split at the first of these
+PASTE_SEPARATOR = re.compile(r": |=|,")
+# Filetypes for the browse dialog
+DATA_FILE_TYPES = [
+    ("Data Files", "*.xlsx *.xlsm *.csv *.json *.db *.sqlite *.sqlite3"),
+    ("Excel Files", "*.xlsx *.xlsm"),
+    ("CSV Files", "*.csv"),
+    ("JSON Files", "*.json"),
+    ("SQLite Databases", "*.db *.sqlite *.sqlite3"),
+]
+
+def is_excel_file(path):
+    return path.lower().endswith(EXCEL_EXTENSIONS)
+
+def load_records(path, client_number=None, table=DEFAULT_TABLE):
+    """Return the records of a CSV, JSON or SQLite source.
+
+    Records have the same form as read_excel_data returns: sanitized keys
+    mapped to formatted string values. A source holds either one client as
+    key/value pairs or a table of clients with a Client_Number column; a CSV
+    is a table only if it has more than two named columns.
+    With client_number only the matching client is returned (an empty list if
+    there is none); tables are scanned or queried only as far as needed.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        records = list(_iter_csv_records(path, client_number))
+    elif extension == ".json":
+        records = _json_records(path, client_number)
+    elif extension in SQLITE_EXTENSIONS:
+        records = _sqlite_records(path, client_number, table)
+    else:
+        raise ValueError(f"Unsupported data source: {path}")
+    logging.debug(f"Loaded {len(records)} record(s) from {path}, client={client_number}")
+    return records
+
+def load_record(path, client_number=None, table=DEFAULT_TABLE):
+    """Return a single client record from a CSV, JSON or SQLite source."""
+    records = load_records(path, client_number, table)
+    if not records:
+        raise ValueError(f"No client {client_number} in {path}" if client_number else f"No data in {path}")
+    if len(records) > 1:
+        raise ValueError(f"{path} holds {len(records)} clients; choose one by {CLIENT_KEY}")
+    return records[0]
+
+def normalize_record(pairs):
+    """Build a record from raw (key, value) pairs, keeping the first non-empty value per key."""
+    record = {}
+    for raw_key, raw_value in pairs:
+        key = sanitize_key(raw_key)
+        if not key:
+            continue
+        value = format_value(raw_value)
+        if key not in record or (value and not record[key]):
+            record[key] = value
+    return record
+
+def parse_pasted_pairs(text):
+    """Return sanitized (key, value) pairs from pasted lines, e.g. copied spreadsheet cells.
+
+    A line with a tab, as spreadsheet cells are copied, is split at its
+    first tab, so keys and values may contain commas. Other lines are split
+    at their first ": ", "=" or ",". Lines without a separator or a key are
+    skipped.
+    """
+    pairs = []
+    skipped = 0
+    for line in text.splitlines():
+        match = re.search("\t", line) or PASTE_SEPARATOR.search(line)
+        key = sanitize_key(line[:match.start()].strip()) if match else ""
+        if not key:
+            skipped += line.strip() != ""
+            continue
+        pairs.append((key, format_value(line[match.end():].strip())))
+    if skipped:
+        logging.debug(f"Skipped {skipped} pasted line(s) without a key and separator")
+    return pairs
+
+def _iter_csv_records(path, client_number):
+    # utf-8-sig drops the byte order mark Excel writes at the start of CSV exports
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        keys = [sanitize_key(name) for name in header]
+        # Excel exports pad rows with empty cells; only named columns count
+        columns = sum(1 for name in header if name.strip())
+        if columns <= 2 or CLIENT_KEY not in keys:
+            # Key/value layout: one client, key in the first column and value in the second.
+            # Save Data writes a Key,Value header row, which is not a pair.
+            is_header = [name.strip().lower() for name in header[:2]] == ["key", "value"]
+            rows = reader if is_header else itertools.chain([header], reader)
+            yield normalize_record((row[0], row[1] if len(row) > 1 else "") for row in rows if row)
+            return
+        client_index = keys.index(CLIENT_KEY)
+        for row in reader:
+            if client_number is not None:
+                if len(row) <= client_index or row[client_index].strip() != client_number:
+                    continue
+                yield normalize_record(zip(header, row))
+                return  # Client numbers are unique; stop reading the file here
+            if any(row):
+                yield normalize_record(zip(header, row))
+
+def _json_records(path, client_number):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        records = [normalize_record(data.items())]
+    elif isinstance(data, list):
+        records = [normalize_record(item.items()) for item in data if isinstance(item, dict)]
+    else:
+        raise ValueError(f"{path} must hold an object or a list of objects")
+    if client_number is not None:
+        records = [record for record in records if record.get(CLIENT_KEY) == client_number]
+    return records
+
+def _read_only_uri(path):
+    """Return a SQLite URI opening path read-only.
+
+    The authority is left empty ("file://" + path), since SQLite rejects a
+    server name there; a UNC path keeps its //server in the path instead,
+    giving file:////server/share/... A drive letter path becomes file:///C:/...
+    """
+    location = os.path.abspath(path).replace(os.sep, "/")
+    if not location.startswith("/"):
+        location = f"/{location}"
+    return f"file://{quote(location, safe='/:')}?mode=ro"
+
+def _sqlite_records(path, client_number, table):
+    if not re.match(r"^\w+$", table):
+        raise ValueError(f"Invalid table name: {table}")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Database not found: {path}")
+    # Read-only, so loading a client never modifies the user's database
+    connection = sqlite3.connect(_read_only_uri(path), uri=True)
+    try:
+        columns = [row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')]
+        if not columns:
+            raise ValueError(f"Table {table} not found in {path}")
+        if client_number is None:
+            rows = connection.execute(f'SELECT * FROM "{table}"')
+        else:
+            client_column = next((column for column in columns if sanitize_key(column) == CLIENT_KEY), None)
+            if client_column is None:
+                raise ValueError(f"Table {table} has no {CLIENT_KEY} column")
+            rows = connection.execute(f'SELECT * FROM "{table}" WHERE "{client_column}" = ?', (client_number,))
+        return [normalize_record(zip(columns, row)) for row in rows]
+    finally:
+        connection.close()
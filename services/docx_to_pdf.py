@@ -1,21 +1,367 @@
 # In services/docx_to_pdf.py
+import atexit
 import logging
-import time
-from docx2pdf import convert
 import os
+import platform
+import queue
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+try:
+    import pythoncom  # Only present on Windows, where Word is driven over COM
+    import win32com.client
+    import win32gui
+    import win32process
+except ImportError:
+    pythoncom = None
+
+
+CONVERTER_BACKENDS = ("auto", "word", "libreoffice", "docx2pdf")
+DEFAULT_TIMEOUT = 300
+# Documents handed to one LibreOffice invocation
+LIBREOFFICE_BATCH_SIZE = 8
+WD_FORMAT_PDF = 17
+
+class WordBackend:
+    """Converts through one Word instance that stays open between documents.
+
+    A document that takes longer than the timeout (e.g. Word waiting on a
+    hidden dialog) gets the Word process killed; the job fails with
+    TimeoutError and the next batch starts a new instance.
+    """
+
+    def __init__(self):
+        if pythoncom is None:
+            raise RuntimeError("Word conversion needs Windows with pywin32 installed")
+        self._word = None
+        self._pid = None
+
+    def convert(self, jobs, timeout):
+        if self._word is None:
+            pythoncom.CoInitialize()
+            self._word = win32com.client.DispatchEx("Word.Application")
+            self._word.Visible = False
+            self._word.DisplayAlerts = 0
+            self._pid = self._word_pid()
+        for docx_path, pdf_path, future in jobs:
+            timed_out = threading.Event()
+            watchdog = threading.Timer(timeout, self._kill, (timed_out,))
+            watchdog.daemon = True
+            watchdog.start()
+            try:
+                doc = self._word.Documents.Open(os.path.abspath(docx_path), ReadOnly=True, AddToRecentFiles=False)
+                try:
+                    doc.SaveAs(os.path.abspath(pdf_path), FileFormat=WD_FORMAT_PDF)
+                finally:
+                    doc.Close(0)
+                future.set_result(pdf_path)
+            except Exception as e:
+                if not timed_out.is_set():
+                    future.set_exception(e)
+            finally:
+                watchdog.cancel()
+            if timed_out.is_set():
+                if not future.done():
+                    future.set_exception(TimeoutError(f"Word did not convert {docx_path} within {timeout}s"))
+                # The instance is gone; the caller fails the rest of the batch and starts a new one
+                raise RuntimeError("Word was stopped after a conversion timed out")
+
+    def _word_pid(self):
+        # Word's COM object does not expose its process, so find its window by a unique caption
+        caption = f"document_filler_{os.getpid()}_{id(self)}"
+        self._word.Caption = caption
+        hwnd = win32gui.FindWindow("OpusApp", caption)
+        return win32process.GetWindowThreadProcessId(hwnd)[1] if hwnd else None
+
+    def _kill(self, timed_out):
+        if self._pid is None:
+            logging.error("Word conversion timed out and Word's process is unknown; it cannot be stopped")
+            return
+        timed_out.set()
+        logging.error(f"Word conversion timed out; stopping Word (process {self._pid})")
+        try:
+            # TerminateProcess on Windows
+            os.kill(self._pid, signal.SIGTERM)
+        except OSError as e:
+            logging.warning(f"Could not stop Word: {str(e)}")
 
-logging.basicConfig(
-    filename=os.path.join(os.path.expanduser("~"), "Documents", "document_filler.log"),
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+    def close(self):
+        if self._word is not None:
+            try:
+                self._word.Quit()
+            except Exception as e:
+                logging.warning(f"Closing Word failed: {str(e)}")
+            self._word = None
+            self._pid = None
+            pythoncom.CoUninitialize()
+
+class LibreOfficeBackend:
+    """Converts batches of documents with headless LibreOffice.
+
+    Each backend instance has its own user profile so several can run side by
+    side, and every invocation converts up to LIBREOFFICE_BATCH_SIZE documents.
+    """
+
+    def __init__(self):
+        self.soffice_path = find_soffice()
+        if not self.soffice_path:
+            raise FileNotFoundError("LibreOffice (soffice) not found")
+        self._profile_dir = tempfile.mkdtemp(prefix="document_filler_lo_profile_")
+
+    def convert(self, jobs, timeout):
+        out_dir = tempfile.mkdtemp(prefix="document_filler_lo_out_")
+        try:
+            # LibreOffice names each PDF after its input, so inputs get unique names
+            # first; two "letter.docx" from different folders would overwrite each other
+            inputs = []
+            for index, (docx_path, _, future) in enumerate(jobs):
+                staged = os.path.join(out_dir, f"{index}.docx")
+                try:
+                    _link_or_copy(docx_path, staged)
+                except OSError as e:
+                    future.set_exception(e)
+                    continue
+                inputs.append(staged)
+            jobs = [job for job in jobs if not job[2].done()]
+            if not jobs:
+                return
+            cmd = [
+                self.soffice_path, "--headless", "--norestore", "--nolockcheck",
+                f"-env:UserInstallation={Path(self._profile_dir).as_uri()}",
+                "--convert-to", "pdf", "--outdir", out_dir,
+            ] + inputs
+            logging.debug(f"Running LibreOffice conversion of {len(jobs)} document(s)")
+            try:
+                subprocess.run(cmd, check=True, capture_output=True, timeout=timeout * len(jobs))
+            except Exception as e:
+                for _, _, future in jobs:
+                    future.set_exception(e)
+                return
+            for staged, (docx_path, pdf_path, future) in zip(inputs, jobs):
+                converted = os.path.splitext(staged)[0] + ".pdf"
+                if os.path.exists(converted):
+                    shutil.move(converted, pdf_path)
+                    future.set_result(pdf_path)
+                else:
+                    future.set_exception(RuntimeError(f"LibreOffice did not convert {docx_path}"))
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def close(self):
+        shutil.rmtree(self._profile_dir, ignore_errors=True)
+
+class Docx2PdfBackend:
+    """Converts one document per docx2pdf call (used on macOS)."""
+
+    def convert(self, jobs, timeout):
+        from docx2pdf import convert
+        for docx_path, pdf_path, future in jobs:
+            try:
+                convert(docx_path, pdf_path)
+                future.set_result(pdf_path)
+            except Exception as e:
+                future.set_exception(e)
+
+    def close(self):
+        pass
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError:
+        # Different volume, or a file system without hard links
+        shutil.copyfile(source, destination)
+
+def find_soffice():
+    """Return the LibreOffice executable path, or None if it is not installed."""
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in (r"C:\Program Files\LibreOffice\program\soffice.exe",
+                 r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+                 "/Applications/LibreOffice.app/Contents/MacOS/soffice"):
+        if os.path.exists(path):
+            return path
+    return None
+
+def resolve_backend(name="auto"):
+    """Return the concrete backend name for name, picking one for this platform on "auto"."""
+    if name not in CONVERTER_BACKENDS:
+        raise ValueError(f"Unknown conversion backend: {name}")
+    if name != "auto":
+        return name
+    if platform.system() == "Windows" and pythoncom is not None:
+        return "word"
+    if platform.system() == "Darwin":
+        return "docx2pdf"
+    return "libreoffice"
+
+_BACKEND_CLASSES = {
+    "word": WordBackend,
+    "libreoffice": LibreOfficeBackend,
+    "docx2pdf": Docx2PdfBackend,
+}
+
+class ConversionService:
+    """Queue of DOCX-to-PDF jobs served by long-lived converter sessions.
+
+    Each worker thread owns one backend session, started on its first job and
+    kept open until close(), and takes jobs off a shared queue in batches.
+    For Word the session is one Word instance; for LibreOffice it is a user
+    profile, and each batch runs its own soffice process.
+    timeout bounds each document from the moment its batch starts, not from
+    submission, so queued documents never time out: Word's instance is killed
+    by a watchdog and LibreOffice's process by a subprocess timeout, and the
+    affected futures fail. docx2pdf cannot be interrupted and is not bounded.
+    """
+
+    def __init__(self, backend="auto", workers=1, timeout=DEFAULT_TIMEOUT):
+        self.backend = resolve_backend(backend)
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._spool_dir = None
+
+    def submit(self, docx_path, pdf_path):
+        """Queue a conversion; returns a Future resolving to pdf_path."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Conversion service is closed")
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"convert-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._queue.put((docx_path, pdf_path, future))
+        return future
+
+    def submit_bytes(self, docx_bytes, pdf_path):
+        """Queue a conversion of an in-memory .docx; returns a Future resolving to pdf_path.
+
+        The document is spooled to a local temp file for the converter and the
+        file is removed as soon as the conversion finishes.
+        """
+        fd, spool_path = tempfile.mkstemp(suffix=".docx", dir=self._spool())
+        with os.fdopen(fd, "wb") as f:
+            f.write(docx_bytes)
+        try:
+            future = self.submit(spool_path, pdf_path)
+        except Exception:
+            os.remove(spool_path)
+            raise
+        future.add_done_callback(lambda _: _remove_quietly(spool_path))
+        return future
+
+    def convert(self, docx_path, pdf_path):
+        """Convert one document and wait for it."""
+        return self.submit(docx_path, pdf_path).result()
+
+    def convert_all(self, pairs):
+        """Convert every (docx_path, pdf_path) pair; returns one error or None per pair."""
+        futures = [self.submit(docx_path, pdf_path) for docx_path, pdf_path in pairs]
+        errors = []
+        for future in futures:
+            try:
+                future.result()
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(self.timeout)
+        if self._spool_dir is not None:
+            shutil.rmtree(self._spool_dir, ignore_errors=True)
+
+    def _spool(self):
+        with self._lock:
+            if self._spool_dir is None:
+                self._spool_dir = tempfile.mkdtemp(prefix="document_filler_spool_")
+            return self._spool_dir
+
+    def _work(self):
+        backend = None
+        batch_size = LIBREOFFICE_BATCH_SIZE if self.backend == "libreoffice" else 1
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            jobs = [job]
+            while len(jobs) < batch_size:
+                try:
+                    extra = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None:
+                    self._queue.put(None)
+                    break
+                jobs.append(extra)
+            # Skip conversions whose caller cancelled them while they were queued
+            jobs = [job for job in jobs if job[2].set_running_or_notify_cancel()]
+            if not jobs:
+                continue
+
+            start_time = time.time()
+            try:
+                if backend is None:
+                    backend = _BACKEND_CLASSES[self.backend]()
+                backend.convert(jobs, self.timeout)
+            except Exception as e:
+                logging.error(f"Word-to-PDF conversion failed: {str(e)}")
+                for _, _, future in jobs:
+                    if not future.done():
+                        future.set_exception(e)
+                # Start a fresh session for the next batch
+                if backend is not None:
+                    backend.close()
+                    backend = None
+            for docx_path, pdf_path, future in jobs:
+                if future.exception() is None:
+                    logging.debug(f"Converted {docx_path} to {pdf_path}")
+                else:
+                    logging.error(f"Word-to-PDF conversion failed for {docx_path}: {str(future.exception())}")
+            logging.debug(f"Converted batch of {len(jobs)} in {time.time() - start_time:.2f} seconds")
+        if backend is not None:
+            backend.close()
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError as e:
+        logging.warning(f"Could not remove spooled document {path}: {str(e)}")
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_conversion_service():
+    """Return the process-wide conversion service, creating it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ConversionService()
+            atexit.register(_service.close)
+        return _service
 
 def convert_docx_to_pdf(docx_path, pdf_path):
     start_time = time.time()
     logging.debug(f"Converting {docx_path} to {pdf_path}")
-    try:
-        convert(docx_path, pdf_path)
-        logging.debug(f"Converted {docx_path} to {pdf_path} in {time.time() - start_time:.2f} seconds")
-    except Exception as e:
-        logging.error(f"Word-to-PDF conversion failed: {str(e)}")
-        raise
\ No newline at end of file
+    get_conversion_service().convert(docx_path, pdf_path)
+    logging.debug(f"Converted {docx_path} to {pdf_path} in {time.time() - start_time:.2f} seconds")
@@ -1,27 +1,72 @@
-import pandas as pd
-import datetime
-import re
-import tkinter as tk
-from tkinter import ttk, messagebox
 import logging
 import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from xml.etree import ElementTree
+from utils.formatter import format_value, format_values, sanitize_key, sanitize_keys
+from services.workbook_cache import get_workbook_cache
+from services.merge_policy import SheetMerger, resolve_conflicts, write_conflict_report
+from utils.logging_setup import summarize
 
-# Log to a local drive
-logging.basicConfig(
-    filename=os.path.join(os.path.expanduser("~"), "Documents", "document_filler.log"),
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 
-datetime_pattern = re.compile(r"^\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?)?$")
+# Upper bound on sheets parsed at the same time
+MAX_PARSE_THREADS = min(4, os.cpu_count() or 1)
+# "stream" reads only the key and value columns row by row; "pandas" parses whole sheets
+EXCEL_READERS = ("stream", "pandas")
+DEFAULT_EXCEL_READER = "stream"
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+def open_workbook(filepath):
+    """Open a workbook once so sheet discovery, selection and parsing can share it."""
+    if _is_workbook(filepath):
+        return filepath
+    # pandas is imported on first parse so cached loads never pay for it
+    import pandas as pd
+    return pd.ExcelFile(filepath, engine='openpyxl')
+
+def get_sheet_names(filepath):
+    """Return the worksheet names of a workbook (a path or an open pd.ExcelFile).
+
+    For a path only xl/workbook.xml is read from the package, without pandas.
+    """
+    if _is_workbook(filepath):
+        return filepath.sheet_names
+    try:
+        with zipfile.ZipFile(filepath) as package:
+            workbook = ElementTree.fromstring(package.read("xl/workbook.xml"))
+            rels = ElementTree.fromstring(package.read("xl/_rels/workbook.xml.rels"))
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        logging.warning(f"Falling back to openpyxl for sheet names of {filepath}: {str(e)}")
+        with open_workbook(filepath) as xls:
+            return xls.sheet_names
+    # Chart sheets are listed too; keep worksheets only, as openpyxl does
+    worksheet_ids = {
+        rel.get("Id") for rel in rels.iter(f"{_PACKAGE_REL_NS}Relationship")
+        if rel.get("Type", "").endswith("/worksheet")
+    }
+    return [sheet.get("name") for sheet in workbook.iter(f"{_MAIN_NS}sheet") if sheet.get(_REL_ID) in worksheet_ids]
+
+def _is_workbook(filepath):
+    return hasattr(filepath, "sheet_names")
 
 def select_sheet(excel_file, parent):
-    """Prompt user to select multiple sheets from a listbox if the Excel file has multiple sheets."""
-    with pd.ExcelFile(excel_file) as xls:
-        sheet_names = xls.sheet_names
-        logging.debug(f"Found sheets: {sheet_names}")
-        if len(sheet_names) == 1:
-            return [sheet_names[0]]
+    """Prompt user to select multiple sheets from a listbox if the Excel file has multiple sheets.
+
+    excel_file may be a path, a workbook already opened with open_workbook, or
+    the list of sheet names.
+    """
+    # Tk is only imported when a dialog is needed so headless runs work without a display
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
+    sheet_names = list(excel_file) if isinstance(excel_file, (list, tuple)) else get_sheet_names(excel_file)
+    logging.debug(f"Found sheets: {sheet_names}")
+    if len(sheet_names) == 1:
+        return [sheet_names[0]]
 
     # Create a Toplevel dialog for sheet selection
     dialog = tk.Toplevel(parent)
@@ -67,6 +112,9 @@ def select_sheet(excel_file, parent):
 
 def resolve_duplicates(duplicates, all_data, parent):
     """Prompt user to select values for duplicate keys with non-identical non-empty values, with a Skip option."""
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
     resolved_data = {}
     dialog = tk.Toplevel(parent)
     dialog.title("Resolve Duplicate Keys")
@@ -115,7 +163,6 @@ def resolve_duplicates(duplicates, all_data, parent):
                 if validate_selection(key, var):
                     if selected_value != "skip":
                         resolved_data[key] = selected_value
-                    logging.info(f"Resolved {key}: {'kept current' if selected_value == 'skip' else f'replaced with {selected_value}'}")
                 else:
                     messagebox.showerror("Error", f"Please select a valid option for key '{key}'", parent=dialog)
                     return
@@ -127,77 +174,210 @@ def resolve_duplicates(duplicates, all_data, parent):
     scrollable_frame.columnconfigure(0, weight=1)
     dialog.wait_window()
 
-    logging.debug(f"Resolved duplicates: {resolved_data}")
+    logging.debug("Resolved %d of %d conflicting key(s) in the dialog: %s", len(resolved_data), len(duplicates), summarize(resolved_data))
     return resolved_data
 
-def read_excel_data(filepath, nrows=None, parent=None):
-    """Read key-value pairs from selected Excel sheets, handling duplicates interactively."""
+def parse_sheets(xls, sheets, nrows=None, cancel_event=None):
+    """Parse sheets of an open workbook as string DataFrames, several at a time.
+
+    Returns the frames in the order of sheets. Setting cancel_event stops
+    sheets that have not started with CancelledError.
+    """
+    def parse(sheet):
+        _check_cancelled(cancel_event)
+        sheet_start = time.perf_counter()
+        # openpyxl gives evaluated values for formula cells
+        df = xls.parse(sheet_name=sheet, header=None, nrows=nrows, dtype=str)
+        logging.debug(f"Parsed sheet {sheet} ({len(df)} rows) in {time.perf_counter() - sheet_start:.3f}s")
+        return df
+
+    if len(sheets) < 2:
+        return [parse(sheet) for sheet in sheets]
+    with ThreadPoolExecutor(max_workers=min(len(sheets), MAX_PARSE_THREADS), thread_name_prefix="sheet") as executor:
+        return list(executor.map(parse, sheets))
+
+def read_excel_data(filepath, nrows=None, parent=None, sheet_names=None, merge_policy="interactive",
+                    sheet_priority=None, conflict_report=None, use_cache=True, reader=DEFAULT_EXCEL_READER,
+                    run_dialog=None, cancel_event=None):
+    """Read key-value pairs from selected Excel sheets and resolve conflicting keys.
+
+    sheet_names selects the sheets to read without a dialog. merge_policy is one
+    of MERGE_POLICIES (services/merge_policy.py); only "interactive" opens the
+    conflict dialog. conflict_report, if given, is a path that receives a JSON
+    report of every conflict and the value chosen for it. reader is one of
+    EXCEL_READERS. The merged sheets are cached on disk by file content, sheets,
+    nrows and reader (see services/workbook_cache.py); conflicts are still
+    resolved on every load.
+
+    When called off the Tk thread, run_dialog(func, *args) must run the sheet
+    and conflict dialogs on the Tk thread and return their result. Setting
+    cancel_event stops the load between sheets with CancelledError.
+    """
+    if reader not in EXCEL_READERS:
+        raise ValueError(f"Unknown Excel reader: {reader}")
+    run_dialog = run_dialog or (lambda func, *args: func(*args))
     logging.debug(f"Reading Excel file: {filepath}, nrows={nrows}")
-    
-    # Check number of sheets
-    with pd.ExcelFile(filepath) as xls:
-        sheet_names = xls.sheet_names
-    
+    start_time = time.perf_counter()
+
+    workbook_sheets = get_sheet_names(filepath)
+
     # Select sheets if multiple
-    sheets_to_read = select_sheet(filepath, parent) if len(sheet_names) > 1 else [sheet_names[0]]
-    
-    # Initialize data and duplicates tracking
-    all_data = {}
-    duplicates = {}
-    
-    for sheet in sheets_to_read:
-        # Read the sheet with openpyxl to get evaluated values
-        df = pd.read_excel(filepath, sheet_name=sheet, header=None, nrows=nrows, dtype=str, engine='openpyxl')
-        
+    if sheet_names is not None:
+        missing = [sheet for sheet in sheet_names if sheet not in workbook_sheets]
+        if missing:
+            raise ValueError(f"Sheets not found in workbook: {', '.join(missing)}")
+        sheets_to_read = list(sheet_names)
+    else:
+        sheets_to_read = run_dialog(select_sheet, workbook_sheets, parent) if len(workbook_sheets) > 1 else [workbook_sheets[0]]
+    select_time = time.perf_counter()
+    _check_cancelled(cancel_event)
+
+    cache = get_workbook_cache() if use_cache and not _is_workbook(filepath) else None
+    cached = None
+    if cache is not None:
+        cache_key = cache.key(filepath, sheets_to_read, nrows, reader)
+        cached = cache.load(cache_key)
+    if cached is not None:
+        all_data, conflicts = cached
+        logging.debug(f"Loaded {filepath} from the workbook cache in {time.perf_counter() - select_time:.3f}s")
+    else:
+        # An already opened pd.ExcelFile can only be parsed through pandas
+        if reader == "stream" and not _is_workbook(filepath):
+            all_data, conflicts = _stream_sheets(filepath, sheets_to_read, nrows, cancel_event)
+        else:
+            all_data, conflicts = _merge_sheets(filepath, sheets_to_read, nrows, cancel_event)
+        if cache is not None:
+            cache.store(cache_key, (all_data, conflicts))
+    logging.debug(f"Excel load for {len(sheets_to_read)} sheet(s): select {select_time - start_time:.3f}s, total {time.perf_counter() - start_time:.3f}s")
+    # A cache hit or the last sheet may finish after the user cancelled; do not open the conflict dialog
+    _check_cancelled(cancel_event)
+
+    if conflicts:
+        logging.debug(f"{len(conflicts)} conflicting key(s), resolving with policy {merge_policy}")
+    resolved_data = resolve_conflicts(
+        conflicts, all_data, merge_policy, sheet_priority,
+        interactive_resolver=lambda duplicates, data: run_dialog(resolve_duplicates, duplicates, data, parent),
+    )
+    if conflict_report and conflicts:
+        write_conflict_report(conflict_report, conflicts, all_data, resolved_data, merge_policy)
+    all_data.update(resolved_data)
+
+    logging.debug("Excel data parsed: %s", summarize(all_data))
+    return all_data
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledError("Excel load cancelled")
+
+def _stream_sheets(filepath, sheets_to_read, nrows, cancel_event=None):
+    """Merge the key and value columns of sheets, reading them row by row.
+
+    openpyxl's read-only mode parses the sheet XML lazily, so only the first
+    two cells of each row are built and reading stops after nrows rows;
+    memory stays flat however wide or long the sheet is.
+    """
+    from openpyxl import load_workbook
+
+    start_time = time.perf_counter()
+    workbook = load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+    merger = SheetMerger()
+    try:
+        for sheet in sheets_to_read:
+            _check_cancelled(cancel_event)
+            sheet_start = time.perf_counter()
+            worksheet = workbook[sheet]
+            rows = worksheet.iter_rows(max_col=2, max_row=nrows)
+            counts = {"rows": 0, "values": 0}
+
+            def pairs():
+                for row in rows:
+                    key = _cell_value(row[0]) if row else None
+                    value = _cell_value(row[1]) if len(row) > 1 else None
+                    if key is None and value is None:
+                        continue
+                    counts["rows"] += 1
+                    if value is not None:
+                        counts["values"] += 1
+                    yield sanitize_key(key), format_value(value)
+
+            merger.add_pairs(sheet, pairs())
+            if not counts["rows"]:
+                logging.warning(f"Sheet {sheet} is empty")
+            elif not counts["values"] and (worksheet.max_column or 0) < 2:
+                logging.error(f"Sheet {sheet} has fewer than two columns")
+                raise ValueError(f"Sheet {sheet} must have at least two columns")
+            logging.debug(f"Streamed sheet {sheet} ({counts['rows']} rows) in {time.perf_counter() - sheet_start:.3f}s")
+        _check_cancelled(cancel_event)
+    finally:
+        workbook.close()
+    logging.debug(f"Excel stream timings for {len(sheets_to_read)} sheet(s): {time.perf_counter() - start_time:.3f}s")
+    return merger.data, merger.conflicts()
+
+def _cell_value(cell):
+    # Error cells (#NAME?, #REF!, ...) are blank, as pandas reads them
+    if cell.data_type == "e":
+        return None
+    return cell.value
+
+def _merge_sheets(filepath, sheets_to_read, nrows, cancel_event=None):
+    """Parse and merge sheets into (all_data, conflicts) before conflicts are resolved."""
+    start_time = time.perf_counter()
+    # One handle for all sheets, so the package is unzipped once
+    with open_workbook(filepath) as xls:
+        open_time = time.perf_counter()
+        frames = parse_sheets(xls, sheets_to_read, nrows, cancel_event)
+    parse_time = time.perf_counter()
+
+    merger = SheetMerger()
+    for sheet, df in zip(sheets_to_read, frames):
+        _check_cancelled(cancel_event)
         if df.empty:
             logging.warning(f"Sheet {sheet} is empty")
             continue
         if df.shape[1] < 2:
             logging.error(f"Sheet {sheet} has fewer than two columns")
             raise ValueError(f"Sheet {sheet} must have at least two columns")
-        
+
         # Use only the first two columns
-        df = df.iloc[:, :2]
-        df.columns = ['Key', 'Value']
-
-        def sanitize_key_name(k):
-            if pd.isna(k):
-                return ""
-            return k.replace(" ", "_").replace("(", "").replace(")", "").replace(",", "").replace("'", "")
-
-        def format_value(val):
-            if pd.isna(val):
-                return ""
-            try:
-                dt = pd.to_datetime(val, errors='coerce')
-                if pd.notna(dt):
-                    return dt.strftime("%m/%d/%Y")
-            except:
-                pass
-            return str(val)
-
-        df['Key'] = df['Key'].apply(sanitize_key_name)
-        df['Value'] = df['Value'].apply(format_value)
-
-        # Merge data and track duplicates within selected sheets
-        for key, value in zip(df['Key'], df['Value']):
-            if key:  # Skip empty keys
-                if key in all_data:
-                    current_value = all_data[key]
-                    if current_value and value and current_value != value:  # Conflict only if both non-empty and different
-                        if (sheet, value) not in duplicates.get(key, []):  # Avoid duplicates in occurrences
-                            duplicates.setdefault(key, []).append((sheet, value))
-                    elif value and not current_value:  # Prefer non-empty value if current is empty
-                        all_data[key] = value
-                else:
-                    all_data[key] = value
+        merger.add(sheet, sanitize_keys(df.iloc[:, 0]), format_values(df.iloc[:, 1]))
+    logging.debug(
+        f"Excel parse timings for {len(sheets_to_read)} sheet(s): open {open_time - start_time:.3f}s, "
+        f"parse {parse_time - open_time:.3f}s, format/merge {time.perf_counter() - parse_time:.3f}s"
+    )
+    return merger.data, merger.conflicts()
+
+def read_excel_records(filepath, layout="columns", sheet_name=None, nrows=None):
+    """Read one key-value record per client from a single sheet.
 
-    # Resolve duplicates if any, skipping if any value is empty
-    if duplicates:
-        effective_duplicates = {k: v for k, v in duplicates.items() if all(occ[1] for occ in v) and all_data.get(k)}
-        if effective_duplicates:
-            resolved_data = resolve_duplicates(effective_duplicates, all_data, parent)
-            all_data.update(resolved_data)
+    filepath may be a path or a workbook already opened with open_workbook.
+    layout "columns": keys in the first column and one client per following column.
+    layout "rows": keys in the first row and one client per following row.
+    Records whose values are all empty are skipped.
+    """
+    logging.debug(f"Reading Excel records: {filepath}, layout={layout}, sheet={sheet_name}, nrows={nrows}")
+    if layout not in ("columns", "rows"):
+        raise ValueError(f"Unknown record layout: {layout}")
+    xls = open_workbook(filepath)
+    try:
+        df = xls.parse(sheet_name=sheet_name or 0, header=None, nrows=nrows, dtype=str)
+    finally:
+        # Leave a workbook the caller opened for the caller to close
+        if xls is not filepath:
+            xls.close()
+    if layout == "rows":
+        df = df.T
+    if df.shape[1] < 2:
+        raise ValueError("Sheet must have a key column and at least one record")
 
-    logging.debug(f"Excel data parsed: {all_data}")
-    return all_data
\ No newline at end of file
+    keys = sanitize_keys(df.iloc[:, 0])
+    records = []
+    for column in df.columns[1:]:
+        values = format_values(df[column])
+        record = {}
+        for key, value in zip(keys, values):
+            if key and (key not in record or (value and not record[key])):
+                record[key] = value
+        if any(record.values()):
+            records.append(record)
+    logging.debug(f"Read {len(records)} records from {filepath}")
+    return records
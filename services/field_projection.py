@@ -0,0 +1,42 @@
+import os
+import logging
+from services.template_cache import get_template_cache, get_pdf_template
+from utils.formatter import sanitized_key_index
+
+def _load_docx_fields(path):
+    # word_filler loads docxtpl, python-docx and jinja2; only Word templates need them
+    from services.word_filler import get_word_template
+    names = frozenset(get_word_template(path).get_undeclared_template_variables())
+    return names, sum(len(name) for name in names)
+
+def get_template_fields(template_path):
+    """Return the set of data keys a template uses, or None if it cannot be determined.
+
+    PDF templates declare form fields, matched by fully qualified or partial name.
+    Word templates are scanned for the variables their Jinja tags reference.
+    The result is cached per template alongside the parsed template.
+    """
+    extension = os.path.splitext(template_path)[1].lower()
+    try:
+        if extension == ".pdf":
+            return get_pdf_template(template_path).field_names
+        if extension == ".docx":
+            return get_template_cache().get(template_path, "docx_fields", _load_docx_fields)
+    except Exception as e:
+        # Fall back to sending everything; the fill step reports the real error
+        logging.warning(f"Could not read fields of {template_path}: {str(e)}")
+    return None
+
+def project_data(data, field_names):
+    """Return only the entries of data that the fields in field_names use.
+
+    Field names that differ from their sanitized form, such as a PDF field
+    called "Date Signed", receive the value of the sanitized key (Date_Signed).
+    """
+    if field_names is None:
+        return dict(data)
+    projected = {key: value for key, value in data.items() if key in field_names}
+    for field, key in sanitized_key_index(field_names).items():
+        if field != key and field not in projected and key in data:
+            projected[field] = data[key]
+    return projected
@@ -0,0 +1,336 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from services.pdf_filler import fill_pdf_template
+from services.docx_to_pdf import ConversionService
+from services.field_projection import get_template_fields, project_data
+from services.pdftk_runner import get_pdftk_pool
+from utils.logging_setup import init_worker_logging, process_log_queue
+from utils.filename_template import FilenameTemplate, sanitize_filename
+import logging
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+# One converter session; Word automation does not tolerate parallel conversions
+DEFAULT_CONVERSION_WORKERS = 1
+# Threads writing archival copies to originals/
+ARCHIVE_WORKERS = 2
+# Seconds between checks of the cancel event while waiting for templates
+CANCEL_POLL_SECONDS = 0.2
+CANCELLED = "Cancelled"
+
+class TemplateResult:
+    """Outcome of generating one template: the files written or the error raised."""
+
+    def __init__(self, template_path):
+        self.template_path = template_path
+        self.outputs = []
+        self.error = None
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+def client_folder_paths(data, output_dir):
+    """Return the (client_folder, originals_folder) paths for a data record."""
+    client_number = data.get("Client_Number", "output")
+    task = data.get("Task", "output")
+    task = task.replace(" ", "_")
+    folder_name = sanitize_filename(f"{task}_{client_number}")
+    client_folder = os.path.join(output_dir, folder_name)
+    return client_folder, os.path.join(client_folder, "originals")
+
+def output_name_for(template_path, data, names=None):
+    """Build the output file name for a template by substituting data keys into its name.
+
+    names is the record's FilenameTemplate, to reuse across its templates.
+    """
+    name = os.path.basename(template_path)
+    output_name = os.path.splitext(name.replace("_template", ""))[0]
+    return (names or FilenameTemplate(data)).render(output_name)
+
+def fill_template(template_path, data, client_folder, originals_folder, output_name, pdf_engine="pdftk"):
+    """Fill one PDF template and return the paths it wrote.
+
+    Word templates go through render_word and the conversion service instead.
+    With originals_folder None, PDFs are written without their unflattened copy.
+    """
+    if not template_path.lower().endswith(".pdf"):
+        raise ValueError(f"Unsupported template type: {template_path}")
+    # Send each template only the keys it actually uses
+    template_data = project_data(data, get_template_fields(template_path))
+
+    pdf_path = os.path.join(client_folder, f"{output_name}.pdf")
+    if originals_folder is None:
+        fill_pdf_template(template_path, pdf_path, template_data, engine=pdf_engine)
+        return [pdf_path]
+    unflattened_pdf_path = os.path.join(originals_folder, f"{output_name}_unflattened.pdf")
+    fill_pdf_template(template_path, pdf_path, template_data, unflattened_output_path=unflattened_pdf_path, engine=pdf_engine)
+    return [pdf_path, unflattened_pdf_path]
+
+def render_word(template_path, data):
+    """Render a Word template for data in memory and return the .docx bytes."""
+    from services.word_filler import render_word_template
+    return render_word_template(template_path, project_data(data, get_template_fields(template_path)))
+
+def write_bytes(path, data):
+    """Write data to path and return the path."""
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+class GenerationEngine:
+    """Generates a packet of templates concurrently.
+
+    Word rendering and pypdf filling run in a process pool; pdftk fills run on
+    threads (the pdftk pool bounds the processes) and every rendered Word file
+    is queued on one ConversionService whose sessions stay open for the run.
+    Word documents are rendered in memory and handed straight to the converter;
+    their originals/ copies are written on separate archive threads, or skipped
+    when keep_originals is False. Results come back in template order and a
+    failing template is reported without stopping the rest of the batch. With
+    a single worker everything runs inline on the calling thread.
+    """
+
+    def __init__(self, workers=None, conversion_workers=DEFAULT_CONVERSION_WORKERS, conversion_backend="auto", keep_originals=True):
+        self.workers = max(1, workers or DEFAULT_WORKERS)
+        self.conversion_workers = max(1, conversion_workers)
+        self.conversion_backend = conversion_backend
+        self.keep_originals = keep_originals
+        self._processes = None
+        self._threads = None
+        self._archiver = None
+        self._converter = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self, wait=True):
+        for executor in (self._processes, self._threads, self._archiver):
+            if executor is not None:
+                executor.shutdown(wait=wait)
+        if self._converter is not None:
+            self._converter.close()
+        self._processes = self._threads = self._archiver = self._converter = None
+
+    def generate(self, template_paths, data, output_dir, pdf_engine="pdftk", progress_callback=None, cancel_event=None):
+        """Generate every template for one data record.
+
+        Returns (client_folder, originals_folder, results) where results is a list
+        of TemplateResult in the order of template_paths. progress_callback, if
+        given, is called on the calling thread as (done, total, result) each time
+        a template finishes. Setting cancel_event (a threading.Event) stops the
+        run between templates; see generate_batch.
+        """
+        return self.generate_batch([data], template_paths, output_dir, pdf_engine, progress_callback, cancel_event)[0]
+
+    def generate_batch(self, records, template_paths, output_dir, pdf_engine="pdftk", progress_callback=None, cancel_event=None):
+        """Generate every template for each data record in one run.
+
+        All records share this engine's workers and template caches, and their
+        templates are scheduled together so the pools stay busy across packets.
+        Returns one (client_folder, originals_folder, results) tuple per record,
+        in record order. A record whose folder is already used by an earlier
+        record of the batch gets the folder name with "_2", "_3", ... appended.
+
+        Once cancel_event is set, templates that have not started are skipped
+        and reported with the error CANCELLED, and so are Word documents whose
+        conversion has not started; templates already being written are
+        finished, so no output file is left half written.
+        """
+        packets = []
+        jobs = []
+        used_folders = set()
+        for data in records:
+            client_folder, originals_folder = client_folder_paths(data, output_dir)
+            # Compared without case, as Windows folder names are
+            if client_folder.lower() in used_folders:
+                # Records with the same Task and Client_Number would overwrite each other's files
+                base_folder = client_folder
+                suffix = 2
+                while f"{base_folder}_{suffix}".lower() in used_folders:
+                    suffix += 1
+                client_folder = f"{base_folder}_{suffix}"
+                originals_folder = os.path.join(client_folder, "originals")
+                logging.warning(f"Several records map to {base_folder}; writing this one to {client_folder}")
+            used_folders.add(client_folder.lower())
+            os.makedirs(client_folder, exist_ok=True)
+            if self.keep_originals:
+                os.makedirs(originals_folder, exist_ok=True)
+            results = [TemplateResult(template) for template in template_paths]
+            packets.append((client_folder, originals_folder, results))
+            names = FilenameTemplate(data)
+            for result in results:
+                job = _Job(result, data, client_folder, originals_folder if self.keep_originals else None)
+                job.output_name = output_name_for(result.template_path, data, names)
+                jobs.append(job)
+
+        start_time = time.time()
+        if self.workers == 1:
+            self._generate_inline(jobs, pdf_engine, progress_callback, cancel_event)
+        else:
+            self._generate_concurrent(jobs, pdf_engine, progress_callback, cancel_event)
+
+        failures = sum(1 for job in jobs if not job.result.ok)
+        logging.debug(f"Generated {len(jobs) - failures}/{len(jobs)} templates for {len(records)} record(s) in {time.time() - start_time:.2f} seconds")
+        logging.debug(f"pdftk pool stats: {get_pdftk_pool().stats()}")
+        return packets
+
+    def _generate_inline(self, jobs, pdf_engine, progress_callback, cancel_event):
+        for index, job in enumerate(jobs):
+            result = job.result
+            template = result.template_path
+            start_time = time.time()
+            if cancel_event is not None and cancel_event.is_set():
+                result.error = CANCELLED
+                if progress_callback:
+                    progress_callback(index + 1, len(jobs), result)
+                continue
+            output_name = job.output_name
+            try:
+                if template.lower().endswith(".docx"):
+                    docx_bytes = render_word(template, job.data)
+                    archive = self._archive(job, output_name, docx_bytes)
+                    pdf_path = os.path.join(job.client_folder, f"{output_name}.pdf")
+                    # The backend enforces the conversion timeout
+                    self._conversion_service().submit_bytes(docx_bytes, pdf_path).result()
+                    if archive is not None:
+                        result.outputs.append(archive.result())
+                    result.outputs.append(pdf_path)
+                else:
+                    result.outputs = fill_template(template, job.data, job.client_folder, job.originals_folder, output_name, pdf_engine)
+            except Exception as e:
+                result.error = str(e)
+                logging.error(f"Template {template} failed: {str(e)}")
+            result.elapsed = time.time() - start_time
+            if progress_callback:
+                progress_callback(index + 1, len(jobs), result)
+
+    def _generate_concurrent(self, jobs, pdf_engine, progress_callback, cancel_event):
+        # Each job runs one or more stages; a job is finished when its last
+        # outstanding stage completes. Word jobs go render -> (convert, archive).
+        pending = {}
+        for job in jobs:
+            template = job.result.template_path
+            job.started = time.time()
+            try:
+                if template.lower().endswith(".docx"):
+                    future = self._process_pool().submit(render_word, template, job.data)
+                    stage = "render"
+                else:
+                    args = (template, job.data, job.client_folder, job.originals_folder, job.output_name, pdf_engine)
+                    if template.lower().endswith(".pdf") and pdf_engine == "pdftk":
+                        future = self._thread_pool().submit(fill_template, *args)
+                    else:
+                        future = self._process_pool().submit(fill_template, *args)
+                    stage = "fill"
+            except Exception as e:
+                future = _failed_future(e)
+                stage = "fill"
+            pending[future] = (job, stage)
+            job.stages = 1
+
+        done_count = 0
+        cancelling = False
+        while pending:
+            if not cancelling and cancel_event is not None and cancel_event.is_set():
+                cancelling = True
+                # Drop fills, renders and conversions that have not started; running ones
+                # finish. Archive copies are left to complete, as they are already in memory.
+                for future, (job, stage) in list(pending.items()):
+                    if stage != "archive" and future.cancel():
+                        del pending[future]
+                        job.stages -= 1
+                        if job.result.error is None:
+                            job.result.error = CANCELLED
+                        if job.stages:
+                            continue
+                        done_count += 1
+                        if progress_callback:
+                            progress_callback(done_count, len(jobs), job.result)
+                logging.debug(f"Generation cancelled; waiting for {len(pending)} running task(s)")
+                continue
+            timeout = CANCEL_POLL_SECONDS if cancel_event is not None and not cancelling else None
+            # Conversions are not timed here: the backend stops a conversion that
+            # runs over its timeout and fails its future, counted from when it starts
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, stage = pending.pop(future)
+                job.stages -= 1
+                result = job.result
+                try:
+                    outputs = future.result()
+                except Exception as e:
+                    if result.error is None:
+                        result.error = str(e)
+                        logging.error(f"Template {result.template_path} failed: {str(e)}")
+                else:
+                    if stage == "render" and cancel_event is not None and cancel_event.is_set():
+                        # Rendered after Cancel; its conversion is not queued
+                        result.error = CANCELLED
+                    elif stage == "render":
+                        pdf_path = os.path.join(job.client_folder, f"{job.output_name}.pdf")
+                        pending[self._conversion_service().submit_bytes(outputs, pdf_path)] = (job, "convert")
+                        job.stages += 1
+                        archive = self._archive(job, job.output_name, outputs)
+                        if archive is not None:
+                            pending[archive] = (job, "archive")
+                            job.stages += 1
+                    elif stage == "archive":
+                        # Keep the originals/ copy ahead of the PDF, as when written synchronously
+                        result.outputs.insert(0, outputs)
+                    elif stage == "convert":
+                        result.outputs.append(outputs)
+                    else:
+                        result.outputs.extend(outputs)
+                if job.stages:
+                    continue
+                result.elapsed = time.time() - job.started
+                done_count += 1
+                if progress_callback:
+                    progress_callback(done_count, len(jobs), result)
+
+    def _archive(self, job, output_name, docx_bytes):
+        """Queue the originals/ copy of a rendered Word document; returns its Future or None."""
+        if job.originals_folder is None:
+            return None
+        if self._archiver is None:
+            self._archiver = ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS, thread_name_prefix="archive")
+        return self._archiver.submit(write_bytes, os.path.join(job.originals_folder, f"{output_name}.docx"), docx_bytes)
+
+    def _process_pool(self):
+        if self._processes is None:
+            # Workers log through the parent so only one process writes the log file
+            self._processes = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker_logging,
+                                                  initargs=(process_log_queue(), logging.getLogger().level))
+        return self._processes
+
+    def _thread_pool(self):
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="generate")
+        return self._threads
+
+    def _conversion_service(self):
+        if self._converter is None:
+            self._converter = ConversionService(self.conversion_backend, workers=self.conversion_workers)
+        return self._converter
+
+class _Job:
+    """One template to generate for one record, with where its outputs go."""
+
+    def __init__(self, result, data, client_folder, originals_folder):
+        self.result = result
+        self.data = data
+        self.client_folder = client_folder
+        self.originals_folder = originals_folder
+        self.output_name = None
+        self.started = 0.0
+        self.stages = 0
+
+def _failed_future(error):
+    future = Future()
+    future.set_exception(error)
+    return future
@@ -0,0 +1,105 @@
+import json
+import logging
+
+MERGE_POLICIES = ("interactive", "first-wins", "last-wins", "sheet-priority", "fail")
+
+class MergeConflictError(ValueError):
+    """Raised by the "fail" policy when selected sheets disagree on a key."""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        keys = ", ".join(list(conflicts)[:10]) + (" ..." if len(conflicts) > 10 else "")
+        super().__init__(f"{len(conflicts)} key(s) have conflicting values across sheets: {keys}")
+
+class SheetMerger:
+    """Merges key/value rows from several sheets and records conflicting values.
+
+    The first non-empty value of a key is kept. Every further distinct
+    (sheet, value) pair for that key is recorded once, using a hashed set, so
+    conflicts can be resolved afterwards by a merge policy.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self._sources = {}
+        self._candidates = {}
+        self._seen = set()
+
+    def add(self, sheet, keys, values):
+        self.add_pairs(sheet, zip(keys, values))
+
+    def add_pairs(self, sheet, pairs):
+        """Merge (key, value) pairs from sheet; pairs may be a lazy iterator."""
+        for key, value in pairs:
+            if not key:  # Skip empty keys
+                continue
+            current_value = self.data.get(key)
+            if current_value is None or (value and not current_value):
+                # New key, or prefer a non-empty value when the current one is empty
+                self.data[key] = value
+                self._sources[key] = sheet
+            elif value:
+                candidates = self._candidates.get(key)
+                if candidates is None:
+                    candidates = self._candidates[key] = [(self._sources[key], current_value)]
+                    self._seen.add((key, self._sources[key], current_value))
+                if (key, sheet, value) not in self._seen:
+                    self._seen.add((key, sheet, value))
+                    candidates.append((sheet, value))
+
+    def conflicts(self):
+        """Return {key: [(sheet, value), ...]} for keys with more than one distinct value.
+
+        The first entry of each list is the value currently in data.
+        """
+        return {
+            key: candidates for key, candidates in self._candidates.items()
+            if any(value != candidates[0][1] for _, value in candidates[1:])
+        }
+
+def resolve_conflicts(conflicts, data, policy="first-wins", sheet_priority=None, interactive_resolver=None):
+    """Return the {key: value} updates that policy picks for each conflict.
+
+    sheet_priority lists sheets from most to least trusted for "sheet-priority";
+    sheets not listed rank after listed ones in reading order.
+    interactive_resolver(duplicates, data) is used for "interactive" and gets
+    only the values that differ from the current one, as the dialog expects.
+    """
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy: {policy}")
+    if not conflicts or policy == "first-wins":
+        return {}
+    if policy == "fail":
+        raise MergeConflictError(conflicts)
+    if policy == "last-wins":
+        return {key: candidates[-1][1] for key, candidates in conflicts.items()}
+    if policy == "sheet-priority":
+        rank = {sheet: i for i, sheet in enumerate(sheet_priority or [])}
+        return {
+            key: min(candidates, key=lambda candidate: rank.get(candidate[0], len(rank)))[1]
+            for key, candidates in conflicts.items()
+        }
+    duplicates = {
+        key: [(sheet, value) for sheet, value in candidates[1:] if value != data.get(key)]
+        for key, candidates in conflicts.items()
+    }
+    if interactive_resolver is None:
+        raise ValueError("The interactive merge policy needs a resolver")
+    return interactive_resolver(duplicates, data)
+
+def write_conflict_report(path, conflicts, data, resolved, policy):
+    """Write every conflict, its candidate values and the value used to a JSON file."""
+    report = {
+        "policy": policy,
+        "conflicts": [
+            {
+                "key": key,
+                "value": resolved.get(key, data.get(key)),
+                "candidates": [{"sheet": sheet, "value": value} for sheet, value in candidates],
+            }
+            for key, candidates in conflicts.items()
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logging.debug(f"Wrote conflict report for {len(conflicts)} key(s) to {path}")
@@ -1,81 +1,92 @@
 import subprocess
 import tempfile
-import os
-import time
-from pypdf import PdfReader
+import threading
+import logging
+from services.pdftk_runner import _CREATION_FLAGS, get_pdftk_path
 
-def extract_fields_pdftk(pdf_path):
-    # Path to pdftk executable
-    pdftk_path = r"./tools/pdftk.exe" #external pdftk_path instead of directly installing.
+# How often the watcher checks cancel_event while pdftk runs
+CANCEL_POLL_SECONDS = 0.1
 
-    # Create a temporary file for the output
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode='w', encoding='utf-8') as temp_file:
-        output_file = temp_file.name
+def iter_fields_pdftk(pdf_path, cancel_event=None):
+    """Yield (name, info) for each form field as pdftk prints it.
 
-    try:
-        # Run the pdftk command with the full path to pdftk.exe
-        result = subprocess.run(
-            [
-                pdftk_path,  # Full path to pdftk.exe
-                pdf_path,
-                "dump_data_fields",
-                "output",
-                output_file
-            ],
-            check=True, capture_output=True, text=True
-        )
-        
-        # Print the output and error (for debugging)
-        print(result.stdout)
-        print(result.stderr)
-        
-        # Parse the fields from the output file
-        fields = []
-        current_field = None
-        with open(output_file, "r", encoding="utf-8") as f:
-            lines = f.read().splitlines()
+    pdftk writes the field dump to stdout, which is parsed line by line, so
+    the first fields arrive while it is still reading a large form. Setting
+    cancel_event kills pdftk, even while it is still parsing and has printed
+    nothing, and ends the iteration. A failed run raises CalledProcessError.
+    """
+    cmd = [get_pdftk_path(), pdf_path, "dump_data_fields_utf8", "output", "-"]
+    logging.debug(f"Running pdftk command: {' '.join(cmd)}")
+    # stderr goes to a file so a chatty pdftk cannot block on a full pipe while stdout is read
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, creationflags=_CREATION_FLAGS)
+        finished = threading.Event()
+        if cancel_event is not None:
+            threading.Thread(target=_kill_on_cancel, args=(proc, cancel_event, finished),
+                             name="pdftk-cancel", daemon=True).start()
+        try:
+            current_field = None
+            for raw_line in proc.stdout:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                line = raw_line.decode("utf-8", errors="replace").strip()
+                if not line or line == "---":
+                    continue
+                if line.startswith("FieldName:"):
+                    if current_field:
+                        yield current_field["name"], current_field
+                    current_field = {"name": line.split(":", 1)[1].strip()}
+                elif current_field:
+                    if line.startswith("FieldType:"):
+                        current_field["type"] = line.split(":", 1)[1].strip()
+                    elif line.startswith("FieldValue:"):
+                        current_field["value"] = line.split(":", 1)[1].strip()
+                    elif line.startswith("FieldStateOption:"):
+                        current_field.setdefault("values", []).append(line.split(":", 1)[1].strip())
+            if proc.wait() != 0:
+                if cancel_event is not None and cancel_event.is_set():
+                    return  # Killed by the watcher
+                stderr_file.seek(0)
+                stderr = stderr_file.read()
+                logging.error(f"pdftk exited with code {proc.returncode}: {stderr.decode(errors='replace').strip()}")
+                raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+            if current_field:
+                yield current_field["name"], current_field
+        finally:
+            # Also reached when the caller stops iterating early
+            finished.set()
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
 
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith("FieldName:"):
-                if current_field:
-                    fields.append((current_field["name"], current_field))
-                current_field = {"name": line.split(":", 1)[1].strip()}
-            elif current_field:
-                if line.startswith("FieldType:"):
-                    current_field["type"] = line.split(":", 1)[1].strip()
-                elif line.startswith("FieldValue:"):
-                    current_field["value"] = line.split(":", 1)[1].strip()
-                elif line.startswith("FieldStateOption:"):
-                    current_field.setdefault("values", []).append(line.split(":", 1)[1].strip())
-        if current_field:
-            fields.append((current_field["name"], current_field))
+def _kill_on_cancel(proc, cancel_event, finished):
+    # Reading stdout blocks until pdftk prints, so cancellation is watched from here
+    while not finished.wait(CANCEL_POLL_SECONDS):
+        if cancel_event.is_set():
+            logging.debug("Field extraction cancelled; stopping pdftk")
+            proc.kill()
+            return
 
-        return fields
-    except subprocess.CalledProcessError as e:
-        print(f"Error calling pdftk: {e}")
-        print(e.stderr)
-        return []
-    finally:
-        # Ensure the temporary file is deleted
-        for _ in range(3):
-            try:
-                os.unlink(output_file)
-                break
-            except OSError:
-                time.sleep(0.1)
-
-def extract_fields_pypdf(pdf_path):
+def iter_fields_pypdf(pdf_path, cancel_event=None):
+    """Yield the name of each form field widget, page by page."""
+    from pypdf import PdfReader
     reader = PdfReader(pdf_path)
-    fields = []
-
     for page in reader.pages:
+        if cancel_event is not None and cancel_event.is_set():
+            return
         if "/Annots" in page:
             for annot in page["/Annots"]:
                 obj = annot.get_object()
                 if "/T" in obj and "/FT" in obj:
-                    fields.append(obj["/T"])
+                    yield obj["/T"]
 
-    return fields
+def extract_fields_pdftk(pdf_path):
+    try:
+        return list(iter_fields_pdftk(pdf_path))
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Error calling pdftk: {e}")
+        return []
+
+def extract_fields_pypdf(pdf_path):
+    return list(iter_fields_pypdf(pdf_path))
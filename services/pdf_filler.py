@@ -1,58 +1,107 @@
-import os
-import subprocess
-import tempfile
 import time
-from fdfgen import forge_fdf
+from concurrent.futures import wait
+from services.pdftk_runner import get_pdftk_pool
+from services.template_cache import get_pdf_template
 import logging
 
-# Log to a local drive to avoid NAS latency
-logging.basicConfig(
-    filename=os.path.join(os.path.expanduser("~"), "Documents", "document_filler.log"),
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
-def get_pdftk_path():
-    """Return the path to pdftk.exe relative to the project directory."""
-    base_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools', 'pdftk.exe')
-    logging.debug(f"Using pdftk path: {base_path}")
-    if not os.path.exists(base_path):
-        logging.error(f"pdftk.exe not found at: {base_path}")
-        raise FileNotFoundError(f"pdftk.exe not found at: {base_path}")
-    return base_path
-
-def fill_pdf_template(input_pdf_path, output_pdf_path, data_dict):
-    """Fill a PDF template with data and save to output path."""
-    start_time = time.time()
-    logging.debug(f"Filling PDF: {input_pdf_path} -> {output_pdf_path}")
+
+# Fill backends accepted by fill_pdf_template
+PDF_ENGINES = ("pdftk", "pypdf")
+CHECKBOX_ON_VALUES = ["yes", "true", "on", "1"]
+
+def prepare_field_values(data_dict):
+    """Convert data values to form field strings, mapping checkbox keys to Yes/Off."""
     adjusted_data = {}
     for key, value in data_dict.items():
         val_str = str(value)
         if key.lower().startswith("check_box") or "checkbox" in key.lower():
-            adjusted_data[key] = "Yes" if val_str.lower() in ["yes", "true", "on", "1"] else "Off"
+            adjusted_data[key] = "Yes" if val_str.lower() in CHECKBOX_ON_VALUES else "Off"
         else:
             adjusted_data[key] = val_str
+    return adjusted_data
 
-    fields = [(key, val) for key, val in adjusted_data.items()]
-    fdf_data = forge_fdf("", fields, [], [], [])
+def fill_pdf_template(input_pdf_path, output_pdf_path, data_dict, unflattened_output_path=None, engine="pdftk"):
+    """Fill a PDF template with data and save a flattened copy to output path.
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".fdf") as fdf_file:
-        fdf_file.write(fdf_data)
-        fdf_file_path = fdf_file.name
+    If unflattened_output_path is given, an editable copy is written there as well.
+    engine selects the backend: "pdftk" runs pdftk.exe, "pypdf" fills in-process and
+    writes both outputs from a single parse of the template.
+    """
+    if engine not in PDF_ENGINES:
+        raise ValueError(f"Unknown PDF engine: {engine}")
+    start_time = time.time()
+    logging.debug(f"Filling PDF ({engine}): {input_pdf_path} -> {output_pdf_path}")
+    adjusted_data = prepare_field_values(data_dict)
 
     try:
-        cmd = [get_pdftk_path(), input_pdf_path, "fill_form", fdf_file_path, "output", output_pdf_path, "flatten"]
-        logging.debug(f"Running pdftk command: {' '.join(cmd)}")
-        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        if engine == "pypdf":
+            _fill_with_pypdf(input_pdf_path, output_pdf_path, adjusted_data, unflattened_output_path)
+        else:
+            _fill_with_pdftk(input_pdf_path, output_pdf_path, adjusted_data, unflattened_output_path)
         logging.debug(f"PDF filled in {time.time() - start_time:.2f} seconds")
-        return fdf_file_path  # Return the FDF file path for reuse
     except Exception as e:
         logging.error(f"PDF filling failed: {str(e)}")
         raise
-    finally:
-        for _ in range(3):
-            try:
-                os.unlink(fdf_file_path)
-                break
-            except OSError:
-                time.sleep(0.1)
\ No newline at end of file
+
+def _fill_with_pdftk(input_pdf_path, output_pdf_path, adjusted_data, unflattened_output_path):
+    # Imported on first fill so the GUI does not load fdfgen at startup
+    from fdfgen import forge_fdf
+    fields = [(key, val) for key, val in adjusted_data.items()]
+    fdf_data = forge_fdf("", fields, [], [], [])
+
+    # Both outputs are queued at once so they run side by side on the pool
+    # pdftk reads a local copy of the cached template instead of the network share
+    pool = get_pdftk_pool()
+    with get_pdf_template(input_pdf_path).local_copy() as local_template:
+        jobs = [pool.fill_form(local_template, fdf_data, output_pdf_path, flatten=True)]
+        if unflattened_output_path:
+            jobs.append(pool.fill_form(local_template, fdf_data, unflattened_output_path))
+        # Both must finish before the local copy is released, even if one fails
+        wait(jobs)
+        for job in jobs:
+            job.result()
+
+def _checkbox_state(field, value):
+    """Return the appearance state name to use for a checkbox field."""
+    if str(value).lower() not in CHECKBOX_ON_VALUES:
+        return "/Off"
+    on_states = [state for state in field.get("/_States_", []) if state != "/Off"]
+    return on_states[0] if on_states else "/Yes"
+
+def _fill_with_pypdf(input_pdf_path, output_pdf_path, adjusted_data, unflattened_output_path):
+    from pypdf import PdfWriter
+    from pypdf.generic import NameObject
+    template = get_pdf_template(input_pdf_path)
+    with template.lock:
+        writer = PdfWriter(clone_from=template.reader)
+    form_fields = template.fields
+
+    values = {}
+    for name, field in form_fields.items():
+        if name not in adjusted_data:
+            continue
+        if field.get("/FT") == "/Btn":
+            values[name] = _checkbox_state(field, adjusted_data[name])
+        else:
+            values[name] = adjusted_data[name]
+
+    if form_fields:
+        # Sets /V and regenerates the appearance streams of the filled fields
+        writer.update_page_form_field_values(None, values, auto_regenerate=False)
+    if unflattened_output_path:
+        writer.write(unflattened_output_path)
+        logging.debug(f"Unflattened PDF created at {unflattened_output_path}")
+
+    if form_fields:
+        # Stamp every widget's appearance into the page content, then drop the form
+        flatten_values = {}
+        for name, field in form_fields.items():
+            if field.get("/FT") == "/Btn":
+                flatten_values[name] = values.get(name, field.get("/V") or "/Off")
+            else:
+                flatten_values[name] = None
+        writer.update_page_form_field_values(None, flatten_values, auto_regenerate=False, flatten=True)
+        writer.remove_annotations(subtypes="/Widget")
+        if NameObject("/AcroForm") in writer._root_object:
+            del writer._root_object[NameObject("/AcroForm")]
+    writer.write(output_pdf_path)
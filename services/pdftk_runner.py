@@ -0,0 +1,107 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+# pdftk has no server mode, so each job is one pdftk process. The pool keeps a
+# fixed set of worker threads that feed those processes over stdin/stdout,
+# which bounds how many pdftk instances run at once and removes temp files.
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# Keep pdftk from flashing a console window when run from the windowed EXE
+_CREATION_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+def get_pdftk_path():
+    """Return the path to pdftk.exe relative to the project directory.
+
+    Falls back to a pdftk found on PATH, as on Linux servers running the CLI.
+    """
+    base_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools', 'pdftk.exe')
+    if not os.path.exists(base_path):
+        base_path = shutil.which("pdftk") or base_path
+    logging.debug(f"Using pdftk path: {base_path}")
+    if not os.path.exists(base_path):
+        logging.error(f"pdftk.exe not found at: {base_path}")
+        raise FileNotFoundError(f"pdftk.exe not found at: {base_path}")
+    return base_path
+
+class PdftkPool:
+    """Bounded pool of workers that run pdftk jobs, passing input data on stdin."""
+
+    def __init__(self, max_workers=None, pdftk_path=None):
+        self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self.pdftk_path = pdftk_path
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdftk")
+        self._stats_lock = threading.Lock()
+        self._stats = {"jobs": 0, "failures": 0, "spawn_time": 0.0, "work_time": 0.0}
+
+    def submit(self, args, input_data=None, timeout=None):
+        """Queue a pdftk run with the given arguments; returns a Future for its stdout bytes."""
+        pdftk_path = self.pdftk_path or get_pdftk_path()
+        return self._executor.submit(self._run, [pdftk_path] + list(args), input_data, timeout)
+
+    def run(self, args, input_data=None, timeout=None):
+        """Run a pdftk job on the pool and wait for its stdout bytes."""
+        return self.submit(args, input_data, timeout).result()
+
+    def fill_form(self, input_pdf_path, fdf_data, output_pdf_path, flatten=False, timeout=None):
+        """Queue a fill_form job that reads the FDF from stdin; returns a Future."""
+        args = [input_pdf_path, "fill_form", "-", "output", output_pdf_path]
+        if flatten:
+            args.append("flatten")
+        return self.submit(args, fdf_data, timeout)
+
+    def stats(self):
+        """Return a snapshot of job counts and cumulative spawn/work seconds."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, cmd, input_data, timeout):
+        logging.debug(f"Running pdftk command: {' '.join(cmd)}")
+        start_time = time.perf_counter()
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=_CREATION_FLAGS,
+        )
+        spawned_time = time.perf_counter()
+        try:
+            stdout, stderr = proc.communicate(input_data, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            self._record(spawned_time - start_time, time.perf_counter() - spawned_time, failed=True)
+            raise
+        self._record(spawned_time - start_time, time.perf_counter() - spawned_time, failed=proc.returncode != 0)
+        if proc.returncode != 0:
+            message = stderr.decode(errors="replace").strip()
+            logging.error(f"pdftk exited with code {proc.returncode}: {message}")
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+        return stdout
+
+    def _record(self, spawn_time, work_time, failed=False):
+        with self._stats_lock:
+            self._stats["jobs"] += 1
+            self._stats["spawn_time"] += spawn_time
+            self._stats["work_time"] += work_time
+            if failed:
+                self._stats["failures"] += 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pdftk_pool():
+    """Return the process-wide pdftk pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PdftkPool()
+        return _pool
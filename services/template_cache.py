@@ -0,0 +1,173 @@
+import atexit
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+import logging
+
+# Upper bound on the approximate memory held by cached templates
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Rough memory of one PDF object once pypdf has parsed it, measured on forms after cloning
+PARSED_OBJECT_BYTES = 4096
+
+class TemplateCache:
+    """Process-wide LRU cache of loaded templates, keyed by path, size and mtime.
+
+    Each entry records the file size and modification time it was loaded from;
+    a lookup whose file no longer matches reloads the template. Entries are
+    evicted least-recently-used first once their combined cost exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, path, kind, loader):
+        """Return the cached value for (path, kind), calling loader(path) on a miss.
+
+        loader must return a (value, cost_in_bytes) tuple.
+        """
+        key = (os.path.abspath(path), kind)
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+
+        logging.debug(f"Loading {kind} template into cache: {path}")
+        value, cost = loader(path)
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (signature, value, cost)
+            self._total_bytes += cost
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                self._discard(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+        return value
+
+    def invalidate(self, path=None):
+        """Drop every cached entry for path, or the whole cache if path is None."""
+        with self._lock:
+            if path is None:
+                keys = list(self._entries)
+            else:
+                abs_path = os.path.abspath(path)
+                keys = [key for key in self._entries if key[0] == abs_path]
+            for key in keys:
+                self._discard(key)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._total_bytes)
+
+    def _discard(self, key):
+        _, value, cost = self._entries.pop(key)
+        self._total_bytes -= cost
+        close = getattr(value, "close", None)
+        if close:
+            close()
+
+class PdfTemplate:
+    """A PDF template held in memory with its parsed AcroForm field tree."""
+
+    def __init__(self, path, data):
+        # pypdf is imported with the first PDF template, not when the app starts
+        from pypdf import PdfReader
+        self.path = path
+        self.data = data
+        self.reader = PdfReader(io.BytesIO(data))
+        self.fields = self.reader.get_fields() or {}
+        # Data keys can match a field by fully qualified or partial (/T) name
+        self.field_names = frozenset(self.fields) | frozenset(
+            str(field["/T"]) for field in self.fields.values() if "/T" in field
+        )
+        # PdfReader reads lazily from one stream, so cloning must be serialized
+        self.lock = threading.Lock()
+        self._local_path = None
+        self._local_users = 0
+        self._closed = False
+
+    def cost(self):
+        """Approximate memory held: the file bytes plus the parsed object tree."""
+        objects = sum(len(generation) for generation in self.reader.xref.values()) + len(self.reader.xref_objStm)
+        return len(self.data) + objects * PARSED_OBJECT_BYTES
+
+    @contextlib.contextmanager
+    def local_copy(self):
+        """Yield the path of a copy of the template on local disk for external tools like pdftk.
+
+        The copy is shared by concurrent users and kept until the last of them
+        is done, even if the template is evicted from the cache meanwhile.
+        """
+        with self.lock:
+            if self._local_path is None:
+                fd, local_path = tempfile.mkstemp(suffix=".pdf", dir=_local_template_dir())
+                with os.fdopen(fd, "wb") as local_file:
+                    local_file.write(self.data)
+                self._local_path = local_path
+            self._local_users += 1
+            local_path = self._local_path
+        try:
+            yield local_path
+        finally:
+            with self.lock:
+                self._local_users -= 1
+                if self._closed:
+                    self._remove_local_copy()
+
+    def close(self):
+        """Called on eviction; the local copy goes once no pdftk job is reading it."""
+        with self.lock:
+            self._closed = True
+            self._remove_local_copy()
+
+    def _remove_local_copy(self):
+        if self._local_path and not self._local_users:
+            try:
+                os.unlink(self._local_path)
+            except OSError:
+                pass
+            self._local_path = None
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def _load_pdf(path):
+    template = PdfTemplate(path, _read_bytes(path))
+    return template, template.cost()
+
+def get_pdf_template(path):
+    """Return the cached PdfTemplate for a PDF file."""
+    return get_template_cache().get(path, "pdf", _load_pdf)
+
+_cache = None
+_cache_lock = threading.Lock()
+_local_dir = None
+
+def get_template_cache():
+    """Return the process-wide template cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TemplateCache()
+        return _cache
+
+def _local_template_dir():
+    global _local_dir
+    with _cache_lock:
+        if _local_dir is None:
+            _local_dir = tempfile.mkdtemp(prefix="document_filler_templates_")
+            atexit.register(shutil.rmtree, _local_dir, True)
+        return _local_dir
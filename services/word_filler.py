@@ -1,6 +1,149 @@
+import io
+import re
+import threading
+import zipfile
 from docxtpl import DocxTemplate
+from docx import Document
+from jinja2 import Environment, meta
+from services.template_cache import get_template_cache
+
+CORE_PROPERTIES = ["author", "comments", "identifier", "language", "subject", "title"]
+FOOTNOTES_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"
+
+class CompiledWordTemplate(DocxTemplate):
+    """A docxtpl template that is parsed and compiled once and rendered many times.
+
+    The package is unzipped and parsed on construction, and the Jinja templates
+    for the body, headers, footers, footnotes and core properties are compiled
+    up front. Each render only evaluates those templates and swaps the rendered
+    parts into the document before saving, so nothing is re-read or re-compiled.
+    Renders of one instance are serialized; use one instance per thread or process
+    for parallel rendering.
+    """
+
+    def __init__(self, template_file, jinja_env=None):
+        if not isinstance(template_file, bytes):
+            with open(template_file, "rb") as f:
+                template_file = f.read()
+        super().__init__(io.BytesIO(template_file))
+        self.jinja_env = jinja_env or Environment()
+        self._lock = threading.Lock()
+        self.init_docx()
+
+        self._sources = []
+        self._body_template = self._compile(self.patch_xml(self.get_xml()))
+        self._part_templates = []
+        for uri in (self.HEADER_URI, self.FOOTER_URI):
+            for rel_key, part in self.get_headers_footers(uri):
+                xml = self.get_part_xml(part)
+                encoding = self.get_headers_footers_encoding(xml)
+                self._part_templates.append((rel_key, self._compile(self.patch_xml(xml)), encoding))
+        self._footnote_templates = []
+        for part in self.docx.part.package.parts:
+            if part.content_type == FOOTNOTES_CONTENT_TYPE:
+                blob = part.blob.decode("utf-8") if isinstance(part.blob, bytes) else part.blob
+                self._footnote_templates.append((part, self._compile(self.patch_xml(blob))))
+        self._property_templates = []
+        for prop in CORE_PROPERTIES:
+            source = getattr(self.docx.core_properties, prop) or ""
+            self._sources.append(source)
+            self._property_templates.append((prop, self.jinja_env.from_string(source)))
+
+    def init_docx(self, reload=True):
+        # The parsed package is reused; rendered parts are replaced on every render
+        if not self.docx:
+            self.docx = Document(self.template_file)
+            self.is_rendered = False
+
+    def render(self, context, jinja_env=None, autoescape=False):
+        """Render context into the document using the precompiled templates.
+
+        The Jinja environment is fixed when the template is compiled, so the
+        jinja_env and autoescape arguments of DocxTemplate.render are ignored.
+        """
+        self.render_init()
+
+        tree = self.fix_tables(self._render_part(self._body_template, self.docx._part, context))
+        self.fix_docpr_ids(tree)
+        self.map_tree(tree)
+
+        for rel_key, template, encoding in self._part_templates:
+            part = self.docx._part.rels[rel_key].target_part
+            xml = self._render_part(template, part, context)
+            self.map_headers_footers_xml(rel_key, xml.encode(encoding))
+
+        for prop, template in self._property_templates:
+            setattr(self.docx.core_properties, prop, template.render(context))
+
+        for part, template in self._footnote_templates:
+            part._blob = self._render_part(template, part, context).encode("utf-8")
+
+        self.is_rendered = True
+
+    def render_to(self, context, output):
+        """Render context and save the document to a path or binary file object."""
+        with self._lock:
+            self.render(context)
+            self.save(output)
+        return output
+
+    def render_bytes(self, context):
+        """Render context and return the document as bytes."""
+        buffer = io.BytesIO()
+        self.render_to(context, buffer)
+        return buffer.getvalue()
+
+    def render_many(self, contexts, outputs):
+        """Render each context to the matching output path or file object."""
+        return [self.render_to(context, output) for context, output in zip(contexts, outputs)]
+
+    def get_undeclared_template_variables(self, jinja_env=None, context=None):
+        env = jinja_env or self.jinja_env
+        variables = set()
+        for source in self._sources:
+            variables |= meta.find_undeclared_variables(env.parse(source))
+        if context is not None:
+            return variables - set(context.keys())
+        return variables
+
+    def _compile(self, src_xml):
+        # Same line splitting docxtpl applies before handing XML to Jinja
+        src_xml = re.sub(r"<w:p([ >])", r"\n<w:p\1", src_xml)
+        self._sources.append(src_xml)
+        return self.jinja_env.from_string(src_xml)
+
+    def _render_part(self, template, part, context):
+        self.current_rendering_part = part
+        dst_xml = template.render(context)
+        dst_xml = re.sub(r"\n<w:p([ >])", r"<w:p\1", dst_xml)
+        dst_xml = (
+            dst_xml.replace("{_{", "{{")
+            .replace("}_}", "}}")
+            .replace("{_%", "{%")
+            .replace("%_}", "%}")
+        )
+        return self.resolve_listing(dst_xml)
+
+def _load_compiled(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    # Parsed XML trees are closer to the uncompressed size than to the file size
+    with zipfile.ZipFile(io.BytesIO(data)) as package:
+        cost = sum(info.file_size for info in package.infolist())
+    return CompiledWordTemplate(data), cost
+
+def get_word_template(template_path):
+    """Return the cached CompiledWordTemplate for a .docx template."""
+    return get_template_cache().get(template_path, "docx", _load_compiled)
 
 def fill_word_template(template_path, context, output_path):
-    doc = DocxTemplate(template_path)
-    doc.render(context)  # This line often triggers error if context is malformed
-    doc.save(output_path)
+    doc = get_word_template(template_path)
+    doc.render_to(context, output_path)  # This line often triggers error if context is malformed
+
+def render_word_template(template_path, context):
+    """Render a Word template in memory and return the .docx bytes."""
+    return get_word_template(template_path).render_bytes(context)
+
+def fill_word_templates(template_path, contexts, output_paths):
+    """Render one template for many contexts in a single call."""
+    return get_word_template(template_path).render_many(contexts, output_paths)
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import pickle
+import threading
+import logging
+
+# Bump when the parsed format or the normalization rules change so stale entries are ignored
+CACHE_FORMAT = 3
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_HASH_CHUNK = 1024 * 1024
+
+def default_cache_dir():
+    """Return the local folder for cached workbooks (never the network drive)."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "DocumentFiller", "workbooks")
+
+class WorkbookCache:
+    """On-disk cache of parsed workbook data, keyed by file content and read options.
+
+    Entries are pickled into one file each under directory. A hit touches its
+    file, and the least recently used files are deleted once the folder grows
+    past max_bytes. Hashes are remembered per (path, size, mtime) so an
+    unchanged file is only hashed once per session.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def key(self, filepath, sheets, nrows, *options):
+        """Return the cache key for reading sheets (in order) and nrows rows of filepath.
+
+        options are any further read settings that change the result.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(self.file_hash(filepath).encode())
+        digest.update(repr((CACHE_FORMAT, list(sheets), nrows) + options).encode())
+        return digest.hexdigest()
+
+    def file_hash(self, filepath):
+        stat = os.stat(filepath)
+        signature = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(signature)
+        if cached:
+            return cached
+        digest = hashlib.blake2b()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+                digest.update(chunk)
+        with self._lock:
+            self._hashes[signature] = digest.hexdigest()
+        return digest.hexdigest()
+
+    def load(self, key):
+        """Return the cached value for key, or None on a miss or an unreadable entry."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Discarding unreadable workbook cache entry {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+    def store(self, key, value):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._entry_path(key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+            self._evict()
+        except OSError as e:
+            # The cache is only an accelerator; a read-only profile must not break loading
+            logging.warning(f"Could not write workbook cache entry: {str(e)}")
+
+    def clear(self):
+        """Delete every cached workbook; returns the number of entries removed."""
+        removed = 0
+        for path in self._entries():
+            if self._remove(path):
+                removed += 1
+        with self._lock:
+            self._hashes.clear()
+        logging.debug(f"Cleared {removed} workbook cache entries from {self.directory}")
+        return removed
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in names if name.endswith(".pkl")]
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _evict(self):
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_workbook_cache():
+    """Return the process-wide workbook cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = WorkbookCache()
+        return _cache
+
+def clear_workbook_cache():
+    return get_workbook_cache().clear()
@@ -0,0 +1,31 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from services.data_sources import load_records, parse_pasted_pairs
+
+class PastedPairsTest(unittest.TestCase):
+    def test_tab_separated_line_splits_at_the_tab(self):
+        pairs = parse_pasted_pairs("Name (Last, First)\tSmith, John")
+        self.assertEqual(pairs, [("Name_Last_First", "Smith, John")])
+
+    def test_other_lines_split_at_the_first_separator(self):
+        pairs = parse_pasted_pairs("Name, Smith: John\nURL=http://a/?b=c\nno separator")
+        self.assertEqual(pairs, [("Name", "Smith: John"), ("URL", "http://a/?b=c")])
+
+class JsonRecordsTest(unittest.TestCase):
+    def test_lists_and_objects_are_flattened_to_text(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "clients.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([{"Client_Number": "NY1", "Owners": ["A", "B"], "Address": {"City": "X"}}], f)
+            records = load_records(path)
+        self.assertEqual(records, [{"Client_Number": "NY1", "Owners": "A, B", "Address": '{"City": "X"}'}])
+
+if __name__ == "__main__":
+    unittest.main()
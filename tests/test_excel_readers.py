@@ -0,0 +1,25 @@
+import os
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from services.excel_parser import read_excel_data, get_sheet_names
+
+BUNDLED_WORKBOOK = os.path.join(ROOT, "assets", "data", "DFT All Input Data With Macro - MAKE A COPY DO NOT EDIT - Copy.xlsm")
+
+class ExcelReaderTest(unittest.TestCase):
+    def test_stream_and_pandas_readers_agree_on_bundled_workbook(self):
+        for sheet in get_sheet_names(BUNDLED_WORKBOOK):
+            with self.subTest(sheet=sheet):
+                streamed = read_excel_data(BUNDLED_WORKBOOK, sheet_names=[sheet], use_cache=False, reader="stream")
+                parsed = read_excel_data(BUNDLED_WORKBOOK, sheet_names=[sheet], use_cache=False, reader="pandas")
+                self.assertEqual(streamed, parsed)
+
+    def test_error_cells_are_blank(self):
+        data = read_excel_data(BUNDLED_WORKBOOK, sheet_names=["6 - NYS Corp Dissolution"], use_cache=False)
+        self.assertEqual(data["All_RP_Name_Address"], "")
+
+if __name__ == "__main__":
+    unittest.main()
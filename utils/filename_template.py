@@ -0,0 +1,84 @@
+import functools
+import re
+from utils.formatter import sanitize_key
+
+# Characters Windows does not allow in file names, plus control characters
+ILLEGAL_CHARACTERS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+# Device names Windows reserves whatever the extension
+RESERVED_NAMES = frozenset(["CON", "PRN", "AUX", "NUL"] + [f"{prefix}{n}" for prefix in ("COM", "LPT") for n in range(1, 10)])
+# Leaves room for the folder path and extension under the 260-character Windows limit
+MAX_NAME_LENGTH = 150
+DEFAULT_NAME = "output"
+
+@functools.lru_cache(maxsize=32)
+def _compile(keys):
+    alternation = _trie_pattern(keys)
+    return re.compile(r"\{([^{}]+)\}" + (f"|({alternation})" if alternation else ""))
+
+def _trie_pattern(keys):
+    """Return a regex matching any of keys, longest key first.
+
+    Keys are merged into a trie so the regex branches on one character at a
+    time instead of trying every key at every position of a name. A key that
+    is a prefix of a longer one ends in a greedy optional group, so
+    "Client_Name_2" wins over "Client_Name".
+    """
+    trie = {}
+    for key in keys:
+        node = trie
+        for character in key:
+            node = node.setdefault(character, {})
+        node[""] = {}  # Marks the end of a key
+
+    def build(node):
+        branches = [re.escape(character) + build(child) for character, child in sorted(node.items()) if character]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+def sanitize_filename_part(value):
+    """Make a data value safe inside a file name: spaces and illegal characters become underscores."""
+    return ILLEGAL_CHARACTERS.sub("_", str(value).replace(" ", "_"))
+
+def sanitize_filename(name):
+    """Make a whole file name (without extension) valid on Windows."""
+    name = ILLEGAL_CHARACTERS.sub("_", name)[:MAX_NAME_LENGTH].rstrip(" .")
+    if not name:
+        return DEFAULT_NAME
+    if name.split(".")[0].upper() in RESERVED_NAMES:
+        name = f"_{name}"
+    return name
+
+class FilenameTemplate:
+    """Substitutes a record's values into template file names in a single pass.
+
+    Both explicit placeholders, "{Client_Number} letter", and bare key names,
+    "Client_Number letter", are replaced. A placeholder may also use the raw
+    key, e.g. "{Date Signed}". Bare keys are matched longest first, and
+    substituted text is never scanned again, so the result does not depend
+    on the order of the data. Unknown placeholders are left as they are.
+    The regex for a key set is compiled once and reused for later records.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._pattern = _compile(frozenset(key for key in data if key))
+        self._values = {}
+
+    def render(self, name):
+        return sanitize_filename(self._pattern.sub(self._replace, name))
+
+    def _replace(self, match):
+        placeholder = match.group(1)
+        if placeholder is None:
+            key = match.group(2)
+        else:
+            key = placeholder if placeholder in self.data else sanitize_key(placeholder.strip())
+            if key not in self.data:
+                return match.group(0)
+        if key not in self._values:
+            self._values[key] = sanitize_filename_part(self.data[key])
+        return self._values[key]
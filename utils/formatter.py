@@ -1,25 +1,84 @@
 # In utils/formatter.py
+import datetime
+import functools
+import json
 import re
-import pandas as pd
-import logging
-import os
 
-logging.basicConfig(
-    filename=os.path.join(os.path.expanduser("~"), "Documents", "document_filler.log"),
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 
+# ISO dates as Excel date cells come out of pandas, with an optional time part
 datetime_pattern = re.compile(r"^\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?)?$")
+DATE_FORMAT = "%m/%d/%Y"
+# Spaces become underscores; characters Jinja names cannot hold are dropped
+KEY_TRANSLATION = str.maketrans({" ": "_", "(": None, ")": None, ",": None, "'": None})
 
+@functools.lru_cache(maxsize=8192)
 def sanitize_key(k):
-    return k.replace(" ", "_").replace("(", "").replace(")", "").replace(",", "").replace("'", "")
+    """Turn a raw key into a placeholder name; missing keys become ""."""
+    if isinstance(k, str):
+        return k.translate(KEY_TRANSLATION)
+    # pandas is only needed for missing-value checks, so plain keys never import it
+    import pandas as pd
+    if k is None or pd.isna(k):
+        return ""
+    return str(k).translate(KEY_TRANSLATION)
+
+def sanitize_keys(keys):
+    """Sanitize a whole column of keys the same way as sanitize_key."""
+    import pandas as pd
+    keys = pd.Series(keys, dtype=object)
+    return keys.where(keys.notna(), "").astype(str).str.translate(KEY_TRANSLATION)
+
+def sanitized_key_index(raw_keys):
+    """Return {raw key: sanitized key} for raw_keys, e.g. PDF field names."""
+    return {raw: sanitize_key(raw) for raw in raw_keys}
 
 def format_value(val):
-    try:
-        dt = pd.to_datetime(val, errors='coerce')
-        if pd.notna(dt):
-            return dt.strftime("%m/%d/%Y")
-    except:
-        pass
-    return str(val)
\ No newline at end of file
+    """Normalize one value: ISO dates to MM/DD/YYYY, missing values to "", anything else to str.
+
+    Lists, e.g. from a JSON record, become their formatted items joined by ", ",
+    and objects become JSON text.
+    """
+    if val is None:
+        return ""
+    if isinstance(val, str):
+        text = val
+    elif isinstance(val, (datetime.date, datetime.datetime)):
+        return val.strftime(DATE_FORMAT)
+    elif isinstance(val, (list, tuple)):
+        return ", ".join(format_value(item) for item in val)
+    elif isinstance(val, dict):
+        return json.dumps(val, ensure_ascii=False, default=str)
+    elif isinstance(val, (int, float)):
+        if val != val:  # NaN
+            return ""
+        # Whole numbers read as floats print like Excel cells read as text: 5, not 5.0
+        text = str(int(val)) if isinstance(val, float) and val.is_integer() else str(val)
+    else:
+        # Only non-string values need pandas' missing-value check (NaN, NA, NaT)
+        import pandas as pd
+        # pd.isna of an array is an array, not a truth value
+        if pd.api.types.is_scalar(val) and pd.isna(val):
+            return ""
+        text = str(val)
+    if datetime_pattern.match(text):
+        try:
+            return datetime.datetime.strptime(text[:10], "%Y-%m-%d").strftime(DATE_FORMAT)
+        except ValueError:
+            pass  # Date-shaped but not a real date, e.g. 2024-13-45
+    return text
+
+def format_values(values):
+    """Normalize a whole column of values the same way as format_value.
+
+    Only cells matching datetime_pattern are parsed, all in one to_datetime call
+    with an explicit format, so plain numbers are never read as dates.
+    """
+    import pandas as pd
+    values = pd.Series(values, dtype=object)
+    formatted = values.where(values.notna(), "").astype(str)
+    candidates = formatted.str.match(datetime_pattern.pattern)
+    if candidates.any():
+        dates = pd.to_datetime(formatted[candidates].str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+        dates = dates[dates.notna()]
+        formatted[dates.index] = dates.dt.strftime(DATE_FORMAT)
+    return formatted
@@ -0,0 +1,130 @@
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import threading
+
+# Overrides the log level, e.g. INFO on machines where the debug log is too slow
+LOG_LEVEL_ENV = "DOCUMENT_FILLER_LOG_LEVEL"
+# Set to 1 to log whole data dicts instead of summaries, when tracking down a bad value
+LOG_PAYLOADS_ENV = "DOCUMENT_FILLER_LOG_PAYLOADS"
+DEFAULT_LEVEL = "DEBUG"
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# The log rotates at this size, keeping this many old files
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+# Keys listed in a payload summary
+SUMMARY_KEYS = 8
+
+_listener = None
+_handlers = []
+_process_queue = None
+_process_listener = None
+_lock = threading.Lock()
+
+def default_log_path():
+    """Return the log file on the local Documents folder."""
+    return os.path.join(os.path.expanduser("~"), "Documents", "document_filler.log")
+
+def configure_logging(level=None, path=None):
+    """Send all logging through a queue to a rotating log file; safe to call more than once.
+
+    Records are only put on a queue by the thread that logs them; a listener
+    thread does the file writes, so a slow roaming-profile folder no longer
+    stalls loading or generation. level defaults to the LOG_LEVEL_ENV
+    variable, then DEBUG.
+    """
+    global _listener
+    level = (level or os.environ.get(LOG_LEVEL_ENV) or DEFAULT_LEVEL).upper()
+    if level not in LOG_LEVELS:
+        level = DEFAULT_LEVEL
+    root = logging.getLogger()
+    with _lock:
+        root.setLevel(level)
+        if _listener is not None:
+            return
+        path = path or default_log_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True)
+        except OSError:
+            # No writable Documents folder; warnings and errors still reach stderr
+            file_handler = logging.StreamHandler()
+            file_handler.setLevel(logging.WARNING)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        _handlers.append(file_handler)
+
+        log_queue = queue.SimpleQueue()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, *_handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+def stop_logging():
+    """Write out the records still queued; called at exit."""
+    global _listener, _process_listener
+    with _lock:
+        for listener in (_process_listener, _listener):
+            if listener is not None:
+                listener.stop()
+        _listener = _process_listener = None
+        for handler in _handlers:
+            handler.close()
+        _handlers.clear()
+
+def process_log_queue():
+    """Return a queue worker processes can log to, or None if logging is not configured.
+
+    Records from the queue go to the same log file, so worker processes never
+    open (or rotate) the file themselves.
+    """
+    global _process_queue, _process_listener
+    with _lock:
+        if _listener is None:
+            return None
+        if _process_queue is None:
+            _process_queue = multiprocessing.Queue()
+            _process_listener = logging.handlers.QueueListener(_process_queue, *_handlers, respect_handler_level=True)
+            _process_listener.start()
+        return _process_queue
+
+def init_worker_logging(log_queue, level):
+    """ProcessPoolExecutor initializer: send the worker's logging to the parent process."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if log_queue is not None:
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+def summarize(payload):
+    """Wrap a log argument so a large dict or list is logged as its size and first keys.
+
+    Use it with %-style arguments, logging.debug("Parsed: %s", summarize(data)),
+    so the text is only built if the record is logged at all. Set the
+    LOG_PAYLOADS_ENV variable to 1 to log the full payload instead.
+    """
+    return _Summary(payload)
+
+class _Summary:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __str__(self):
+        payload = self.payload
+        if os.environ.get(LOG_PAYLOADS_ENV) == "1":
+            return repr(payload)
+        if isinstance(payload, dict):
+            keys = list(payload)
+            more = f", ... {len(keys) - SUMMARY_KEYS} more" if len(keys) > SUMMARY_KEYS else ""
+            return f"{len(keys)} key(s): {', '.join(map(str, keys[:SUMMARY_KEYS]))}{more}"
+        if isinstance(payload, (list, tuple, set, frozenset)):
+            return f"{len(payload)} item(s)"
+        text = str(payload)
+        return text if len(text) <= 200 else f"{text[:200]}... ({len(text)} characters)"
@@ -0,0 +1,139 @@
+import builtins
+import importlib
+import os
+import sys
+import threading
+import time
+import logging
+
+# Set to 1, or to a file path for the report, to time every import made while the window starts
+PROFILE_ENV = "DOCUMENT_FILLER_PROFILE_STARTUP"
+# Set to 0 to skip loading the heavy libraries in the background after the window appears
+WARM_ENV = "DOCUMENT_FILLER_WARM_IMPORTS"
+# The log gets a warning when the window takes longer than this to appear
+STARTUP_BUDGET_SECONDS = 1.5
+# Libraries the first load or generate would otherwise wait for, in the order they are usually needed
+WARM_MODULES = ("openpyxl", "pandas", "pypdf", "fdfgen", "services.word_filler", "services.docx_to_pdf")
+# Libraries only the named converter backend imports; Word's COM modules come with services.docx_to_pdf
+BACKEND_MODULES = {"docx2pdf": ("docx2pdf",)}
+# Delay so the window is drawn and idle before the warm-up competes with it
+WARM_DELAY_MS = 500
+REPORT_LINES = 40
+
+# Taken when main.py imports this module, which it does first
+_start_time = time.perf_counter()
+
+def elapsed():
+    """Return the seconds since the application started."""
+    return time.perf_counter() - _start_time
+
+class StartupProfile:
+    """Times each module first imported on the main thread while installed.
+
+    Every import is recorded with its cumulative time (including the modules
+    it imports) and its own time, much like python -X importtime, which is
+    not usable from the windowed EXE. mark adds named milestones.
+    """
+
+    def __init__(self):
+        self.imports = {}  # Module name -> [cumulative seconds, own seconds]
+        self.milestones = []
+        self._children = []  # Time spent in nested imports, one entry per import in progress
+        self._original_import = None
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, name):
+        self.milestones.append((name, elapsed()))
+
+    def report(self):
+        """Return the milestones and the most expensive imports as text."""
+        lines = [f"{name}: {seconds * 1000:.0f} ms after start" for name, seconds in self.milestones]
+        lines.append(f"{len(self.imports)} modules imported; most expensive first (cumulative / own ms):")
+        ranked = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (cumulative, own) in ranked[:REPORT_LINES]:
+            lines.append(f"{cumulative * 1000:9.1f} {own * 1000:9.1f}  {name}")
+        return "\n".join(lines)
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules or threading.current_thread() is not threading.main_thread():
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - start
+            nested = self._children.pop()
+            if self._children:
+                self._children[-1] += cumulative
+            self.imports[name] = [cumulative, cumulative - nested]
+
+def start_profile():
+    """Start timing imports if the profile environment variable is set; returns the profile or None."""
+    if not os.environ.get(PROFILE_ENV):
+        return None
+    profile = StartupProfile()
+    profile.install()
+    profile.mark("profile started")
+    return profile
+
+def window_shown(profile=None):
+    """Record that the window is up, check the startup budget and write the profile report."""
+    seconds = elapsed()
+    if seconds > STARTUP_BUDGET_SECONDS:
+        logging.warning(f"Window shown after {seconds:.2f}s, over the {STARTUP_BUDGET_SECONDS:.1f}s startup budget")
+    else:
+        logging.debug(f"Window shown after {seconds:.2f}s")
+    if profile is None:
+        return
+    profile.uninstall()
+    profile.mark("window shown")
+    report = profile.report()
+    logging.info(f"Startup profile:\n{report}")
+    target = os.environ.get(PROFILE_ENV)
+    if target and target != "1":
+        try:
+            with open(target, "w", encoding="utf-8") as f:
+                f.write(report + "\n")
+        except OSError as e:
+            logging.error(f"Could not write startup profile to {target}: {str(e)}")
+
+def warm_imports(modules=WARM_MODULES):
+    """Import modules on a background thread so the first feature using them starts at once.
+
+    The libraries of the converter backend "auto" resolves to on this machine
+    are warmed after modules; other backends' are not loaded.
+    """
+    if os.environ.get(WARM_ENV, "1") == "0":
+        return None
+
+    def run():
+        for name in list(modules) + list(_backend_modules()):
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                # The feature reports the real error when it is used
+                logging.debug(f"Warm-up import of {name} failed: {str(e)}")
+                continue
+            logging.debug(f"Warmed {name} in {time.perf_counter() - start:.2f}s")
+
+    thread = threading.Thread(target=run, name="warm-imports", daemon=True)
+    thread.start()
+    return thread
+
+def _backend_modules():
+    try:
+        from services.docx_to_pdf import resolve_backend
+        return BACKEND_MODULES.get(resolve_backend(), ())
+    except Exception as e:
+        logging.debug(f"Could not resolve the converter backend to warm: {str(e)}")
+        return ()